@@ -1,4 +1,5 @@
 # about/tests/test_urls.py
+from django.core.cache import cache
 from django.test import Client, TestCase
 from http import HTTPStatus
 
@@ -6,6 +7,7 @@ from http import HTTPStatus
 class StaticURLTests(TestCase):
     def setUp(self):
         self.guest_client = Client()
+        cache.clear()
 
     def test_about_url_uses_correct_template(self):
         """Проверка использования корректных шаблонов
@@ -1,4 +1,5 @@
 # tests/tests/test_views.py
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 from http import HTTPStatus
@@ -7,6 +8,7 @@ from http import HTTPStatus
 class StaticViewsTests(TestCase):
     def setUp(self):
         self.guest_client = Client()
+        cache.clear()
 
     def test_about_page_accessible_by_name(self):
         """Проверка, что URL доступен по namespace"""
@@ -0,0 +1,45 @@
+from posts.stats import post_stats
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+POST_FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: isoformat(post.pub_date),
+    'author': lambda post: post.author.username,
+    'author_name': lambda post: post.author.get_full_name(),
+    'group': lambda post: post.group.slug if post.group else None,
+    'image': lambda post: post.image.url if post.image else None,
+    'comments_count': lambda post: post_stats(post).comments_count,
+}
+
+COMMENT_FIELDS = {
+    'id': lambda comment: comment.pk,
+    'post': lambda comment: comment.post_id,
+    'text': lambda comment: comment.text,
+    'created': lambda comment: isoformat(comment.created),
+    'author': lambda comment: comment.author.username,
+}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def select_fields(requested, serializers):
+    """Поля из параметра ?fields=a,b; без параметра - все."""
+
+    if not requested:
+        return tuple(serializers)
+    fields = tuple(field.strip() for field in requested.split(','))
+    unknown = set(fields) - set(serializers)
+    if unknown:
+        raise InvalidFields(', '.join(sorted(unknown)))
+    return fields
+
+
+def serialize(obj, serializers, fields):
+    return {field: serializers[field](obj) for field in fields}
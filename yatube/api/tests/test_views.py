@@ -0,0 +1,183 @@
+# api/tests/test_views.py
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import datetime
+from http import HTTPStatus
+
+from posts.models import Comment, Follow, Group, Post
+from posts.paginators import CURSOR_NEXT, encode_cursor
+
+User = get_user_model()
+
+
+class ApiViewsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for number in range(13):
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                text=f'Тестовый пост номер {number}',
+            )
+        cls.post = Post.objects.first()
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Первый комментарий'
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.author, text='Второй комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, params=None, **kwargs):
+        return self.client.get(reverse(f'api:{name}', kwargs=kwargs), params)
+
+    def test_posts_are_paginated_by_cursor(self):
+        """Лента отдаётся страницами по курсору в обе стороны"""
+        first = self.get('posts').json()
+        self.assertEqual(len(first['results']), 10)
+        self.assertIsNone(first['previous'])
+        self.assertEqual(first['results'][0], {
+            'id': self.post.pk,
+            'text': self.post.text,
+            'pub_date': self.post.pub_date.isoformat(),
+            'author': 'author',
+            'author_name': 'Лев Толстой',
+            'group': None,
+            'image': None,
+            'comments_count': 2,
+        })
+        second = self.get('posts', {'cursor': first['next']}).json()
+        self.assertEqual(len(second['results']), 3)
+        self.assertIsNone(second['next'])
+        back = self.get('posts', {'cursor': second['previous']}).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_out_of_range_cursor(self):
+        """Курсор за концом ленты даёт пустую страницу, а не ошибку"""
+        last = self.get('posts', {'limit': 13}).json()['results'][-1]
+        Post.objects.filter(pk=last['id']).delete()
+        cursors = (
+            encode_cursor(
+                CURSOR_NEXT, datetime(1970, 1, 2, tzinfo=timezone.utc), 1
+            ),
+            encode_cursor(
+                CURSOR_NEXT, parse_datetime(last['pub_date']), last['id']
+            ),
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.get('posts', {'cursor': cursor})
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(response.json(), {
+                    'results': [], 'next': None, 'previous': None
+                })
+
+    def test_fields_and_limit(self):
+        """Можно выбрать поля и размер страницы"""
+        first, second = Post.objects.all()[:2]
+        response = self.get('posts', {'fields': 'id,group', 'limit': 2})
+        self.assertEqual(
+            response.json()['results'],
+            [
+                {'id': first.pk, 'group': None},
+                {'id': second.pk, 'group': 'test_slug'},
+            ]
+        )
+        self.assertEqual(
+            len(self.get('posts', {'limit': 1000}).json()['results']), 13
+        )
+
+    def test_bad_requests(self):
+        """Ошибки параметров и отсутствующие объекты возвращаются в JSON"""
+        requests = (
+            ('posts', {'fields': 'id,password'}, {}, HTTPStatus.BAD_REQUEST),
+            ('posts', {'cursor': 'broken'}, {}, HTTPStatus.BAD_REQUEST),
+            ('posts', {'limit': 'many'}, {}, HTTPStatus.BAD_REQUEST),
+            ('post_detail', None, {'post_id': 0}, HTTPStatus.NOT_FOUND),
+            ('group_posts', None, {'slug': 'missing'}, HTTPStatus.NOT_FOUND),
+            ('follow_posts', None, {}, HTTPStatus.UNAUTHORIZED),
+        )
+        for name, params, kwargs, status in requests:
+            with self.subTest(name=name, params=params):
+                response = self.get(name, params, **kwargs)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', response.json())
+        response = self.client.post(reverse('api:posts'))
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+
+    def test_group_profile_and_follow_feeds(self):
+        """Ленты группы, автора и подписок содержат нужные посты"""
+        group_ids = {
+            post['id'] for post in
+            self.get('group_posts', {'limit': 50}, slug='test_slug')
+            .json()['results']
+        }
+        self.assertEqual(
+            group_ids, set(self.group.posts.values_list('pk', flat=True))
+        )
+        profile = self.get('profile_posts', username='author').json()
+        self.assertEqual(len(profile['results']), 10)
+        self.assertEqual(
+            self.get('profile_posts', username='reader').json()['results'],
+            []
+        )
+        self.client.force_login(self.reader)
+        self.assertEqual(self.get('follow_posts').json()['results'], [])
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            self.get('follow_posts').json()['results'][0]['id'], self.post.pk
+        )
+
+    def test_post_detail_and_comments(self):
+        """Пост и его комментарии, новые первыми"""
+        response = self.get('post_detail', post_id=self.post.pk)
+        self.assertEqual(response.json()['text'], self.post.text)
+        comments = self.get(
+            'comments', {'limit': 1}, post_id=self.post.pk
+        ).json()
+        self.assertEqual(
+            [comment['text'] for comment in comments['results']],
+            ['Второй комментарий']
+        )
+        comments = self.get(
+            'comments', {'cursor': comments['next']}, post_id=self.post.pk
+        ).json()
+        self.assertEqual(
+            [comment['author'] for comment in comments['results']],
+            ['reader']
+        )
+
+    def test_etag(self):
+        """Повторный запрос с ETag получает 304 до следующей записи"""
+        url = reverse('api:posts')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(author=self.author, text='Новый пост в ленте')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_feed_query_count_does_not_grow(self):
+        """Число запросов не зависит от размера страницы"""
+        for limit in (1, 10):
+            cache.clear()
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(1):
+                    self.get('posts', {'limit': limit})
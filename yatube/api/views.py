@@ -0,0 +1,158 @@
+from functools import wraps
+from http import HTTPStatus
+
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from posts.caching import cache_feed_page, conditional_page
+from posts.models import Comment, Group, Post, User
+from posts.paginators import CursorPaginator, InvalidCursor
+from posts.timeline import timeline_posts
+from .serializers import (
+    COMMENT_FIELDS, POST_FIELDS, InvalidFields, select_fields, serialize
+)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+class BadRequest(Exception):
+    pass
+
+
+def json_response(data, status=HTTPStatus.OK):
+    return JsonResponse(
+        data,
+        status=status,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}
+    )
+
+
+def api_view(view):
+    """Только GET/HEAD; ошибки возвращаются в JSON, а не страницей."""
+
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return json_response(
+                {'detail': 'Не найдено.'}, HTTPStatus.NOT_FOUND
+            )
+        except BadRequest as error:
+            return json_response(
+                {'detail': str(error)}, HTTPStatus.BAD_REQUEST
+            )
+    return wrapper
+
+
+def login_required(view):
+    """Для анонимного пользователя - 401 вместо редиректа на вход."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return json_response(
+                {'detail': 'Требуется авторизация.'}, HTTPStatus.UNAUTHORIZED
+            )
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def get_fields(request, serializers):
+    try:
+        return select_fields(request.GET.get('fields'), serializers)
+    except InvalidFields as error:
+        raise BadRequest(f'Неизвестные поля: {error}.')
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise BadRequest('limit должен быть числом.')
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def page_response(request, queryset, serializers, field='pub_date'):
+    """Страница объектов по курсору (?cursor=...&limit=N&fields=...)."""
+
+    fields = get_fields(request, serializers)
+    paginator = CursorPaginator(queryset, get_limit(request), field)
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        raise BadRequest('Некорректный курсор.')
+    return json_response({
+        'results': [serialize(obj, serializers, fields) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def feed(queryset):
+    return queryset.select_related('stats').feed('stats__comments_count')
+
+
+@api_view
+@conditional_page
+@cache_feed_page('api_posts')
+def posts(request):
+    """Лента всех постов."""
+
+    return page_response(request, feed(Post.objects.all()), POST_FIELDS)
+
+
+@api_view
+@conditional_page
+@cache_feed_page('api_group_posts')
+def group_posts(request, slug):
+    """Лента группы."""
+
+    group = get_object_or_404(Group, slug=slug)
+    return page_response(request, feed(group.posts.all()), POST_FIELDS)
+
+
+@api_view
+@conditional_page
+@cache_feed_page('api_profile_posts')
+def profile_posts(request, username):
+    """Посты автора."""
+
+    author = get_object_or_404(User, username=username)
+    return page_response(request, feed(author.posts.all()), POST_FIELDS)
+
+
+@api_view
+@login_required
+@conditional_page
+def follow_posts(request):
+    """Лента подписок текущего пользователя."""
+
+    return page_response(
+        request, feed(timeline_posts(request.user)), POST_FIELDS
+    )
+
+
+@api_view
+@conditional_page
+def post_detail(request, post_id):
+    """Пост."""
+
+    fields = get_fields(request, POST_FIELDS)
+    post = get_object_or_404(feed(Post.objects.all()), pk=post_id)
+    return json_response(serialize(post, POST_FIELDS, fields))
+
+
+@api_view
+@conditional_page
+def comments(request, post_id):
+    """Комментарии к посту, новые первыми."""
+
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    queryset = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only('post_id', 'text', 'created', 'author__username')
+    return page_response(request, queryset, COMMENT_FIELDS, 'created')
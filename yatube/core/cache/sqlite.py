@@ -0,0 +1,261 @@
+"""Общий для всех процессов узла кэш в файле SQLite.
+
+LocMemCache у каждого WSGI-воркера свой, поэтому с ростом числа
+процессов падает доля попаданий, а сброс кэша доходит только до
+одного процесса. Этот backend хранит записи в одном файле SQLite
+в режиме WAL: читатели не блокируют писателя, а все воркеры видят
+одни и те же данные. Размер кэша ограничен в байтах (OPTIONS
+MAX_SIZE); при превышении вытесняются давно не читавшиеся записи.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.sqlite.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {'MAX_SIZE': 256 * 1024 * 1024},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core.metrics import record_cache_access
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, '
+    'accessed REAL NOT NULL, size INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_size ('
+    'id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)',
+    'INSERT OR IGNORE INTO cache_size (id, total) VALUES (0, 0)',
+    'CREATE TRIGGER IF NOT EXISTS cache_size_insert AFTER INSERT ON cache '
+    'BEGIN UPDATE cache_size SET total = total + new.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_size_delete AFTER DELETE ON cache '
+    'BEGIN UPDATE cache_size SET total = total - old.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_size_update AFTER UPDATE ON cache '
+    'BEGIN UPDATE cache_size SET total = total - old.size + new.size; END',
+)
+UPSERT = (
+    'INSERT INTO cache (key, value, expires, accessed, size) '
+    'VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+    'value = excluded.value, expires = excluded.expires, '
+    'accessed = excluded.accessed, size = excluded.size'
+)
+# Удаление самых давно читавшихся записей суммарным размером
+# не меньше заданного числа байт.
+EVICT = (
+    'DELETE FROM cache WHERE key IN ('
+    'SELECT key FROM (SELECT key, size, SUM(size) OVER '
+    '(ORDER BY accessed ROWS UNBOUNDED PRECEDING) AS running '
+    'FROM cache) WHERE running - size < ?)'
+)
+
+# Время последнего чтения обновляется не чаще, чем раз в столько
+# секунд: точность LRU меняется на отсутствие записи при каждом get().
+ACCESS_RESOLUTION = 1.0
+
+
+class SQLiteCache(BaseCache):
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._cull_ratio = float(options.get('CULL_RATIO', 0.9))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    def _connection(self):
+        """Соединение текущего потока; после fork открывается заново."""
+
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self._path,
+                timeout=self._busy_timeout,
+                isolation_level=None,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        """Транзакция, сразу берущая блокировку на запись."""
+
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    @staticmethod
+    def _is_alive(expires, now):
+        return expires is None or expires > now
+
+    def _read(self, connection, key, now):
+        row = connection.execute(
+            'SELECT value, expires, accessed FROM cache WHERE key = ?',
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires, accessed = row
+        if not self._is_alive(expires, now):
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, now)
+            )
+            return None
+        if now - accessed > ACCESS_RESOLUTION:
+            connection.execute(
+                'UPDATE cache SET accessed = ? WHERE key = ?', (now, key)
+            )
+        return value
+
+    def _write(self, connection, key, value, timeout, now):
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        connection.execute(UPSERT, (
+            key, blob, self.get_backend_timeout(timeout), now, len(blob)
+        ))
+
+    def _cull(self, connection):
+        total, = connection.execute(
+            'SELECT total FROM cache_size'
+        ).fetchone()
+        if total <= self._max_size:
+            return
+        now = time.time()
+        connection.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        total, = connection.execute(
+            'SELECT total FROM cache_size'
+        ).fetchone()
+        excess = total - int(self._max_size * self._cull_ratio)
+        if excess > 0:
+            connection.execute(EVICT, (excess,))
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        value = self._read(self._connection(), key, time.time())
+        record_cache_access(value is not None)
+        if value is None:
+            return default
+        return pickle.loads(value)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        now = time.time()
+        placeholders = ', '.join('?' * len(keys))
+        rows = self._connection().execute(
+            f'SELECT key, value, expires FROM cache '
+            f'WHERE key IN ({placeholders})',
+            list(keys)
+        ).fetchall()
+        found = {
+            keys[key]: pickle.loads(value)
+            for key, value, expires in rows
+            if self._is_alive(expires, now)
+        }
+        for _ in range(len(found)):
+            record_cache_access(True)
+        for _ in range(len(keys) - len(found)):
+            record_cache_access(False)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            self._write(connection, key, value, timeout, time.time())
+            self._cull(connection)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        with self._transaction() as connection:
+            for key, value in data.items():
+                self._write(
+                    connection, self._key(key, version), value, timeout, now
+                )
+            self._cull(connection)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as connection:
+            if self._read(connection, key, now) is not None:
+                return False
+            self._write(connection, key, value, timeout, now)
+            self._cull(connection)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            value = self._read(connection, key, time.time())
+            if value is None:
+                raise ValueError(f"Key '{key}' not found")
+            new_value = pickle.loads(value) + delta
+            blob = pickle.dumps(new_value, pickle.HIGHEST_PROTOCOL)
+            connection.execute(
+                'UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                (blob, len(blob), key)
+            )
+        return new_value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time())
+        )
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            'SELECT expires FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        return row is not None and self._is_alive(row[0], time.time())
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if not keys:
+            return
+        placeholders = ', '.join('?' * len(keys))
+        self._connection().execute(
+            f'DELETE FROM cache WHERE key IN ({placeholders})', keys
+        )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединения живут всё время работы потока: открытие файла
+        # и проверка схемы на каждый запрос обошлись бы дороже кэша.
+        pass
@@ -0,0 +1,127 @@
+"""Защита от одновременного пересчёта популярных записей кэша.
+
+Запись хранится вместе с версией, временем устаревания и временем,
+которое заняло её вычисление. Пересчитывает её только процесс,
+получивший блокировку (cache.add); остальные в это время отдают
+прежнее значение. Кроме того, незадолго до устаревания запись
+с вероятностью, растущей по мере приближения срока, пересчитывается
+заранее (алгоритм XFetch), поэтому истечение срока не приходит
+ко всем воркерам одновременно.
+
+    html = get_or_refresh(key, render, timeout, version=generation)
+"""
+import math
+import random
+import time
+from collections import namedtuple
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+LOCK_SUFFIX = ':lock'
+WAIT_INTERVAL = 0.05
+
+# Результат lookup(): value - значение из кэша; refresh - значение
+# нужно вычислить; lock - метка блокировки, если она досталась этому
+# процессу (только тогда результат можно сохранить через store())
+Lookup = namedtuple('Lookup', 'value refresh lock')
+
+
+def lock_key(key):
+    return key + LOCK_SUFFIX
+
+
+def acquire(key):
+    """Метка блокировки пересчёта key или None, если она занята."""
+
+    token = uuid4().hex
+    if cache.add(lock_key(key), token, settings.CACHE_LOCK_TIMEOUT):
+        return token
+    return None
+
+
+def release(key, lock):
+    """Снятие блокировки, только если она всё ещё принадлежит lock.
+
+    Блокировка могла истечь и достаться другому процессу; его
+    блокировку удалять нельзя.
+    """
+
+    if lock is not None and cache.get(lock_key(key)) == lock:
+        cache.delete(lock_key(key))
+
+
+def is_fresh(entry, version, beta):
+    _, entry_version, expires, delta = entry
+    if entry_version != version:
+        return False
+    jitter = delta * beta * -math.log(1.0 - random.random())
+    return time.time() + jitter < expires
+
+
+def lookup(key, version=None, beta=None):
+    """Значение key и признак того, что его нужно пересчитать.
+
+    Блокировку (lock) получает один процесс: он пересчитывает
+    значение и должен вызвать store() или release(). Пока идёт
+    пересчёт, остальные получают устаревшее значение, а если его
+    нет - ждут до CACHE_LOCK_WAIT секунд. Не дождавшись, процесс
+    вычисляет значение сам, но без блокировки и без сохранения.
+    """
+
+    if beta is None:
+        beta = settings.CACHE_EARLY_REFRESH_BETA
+    entry = cache.get(key)
+    if entry is not None and is_fresh(entry, version, beta):
+        return Lookup(entry[0], False, None)
+    lock = acquire(key)
+    if lock is not None:
+        return Lookup(None, True, lock)
+    if entry is not None:
+        return Lookup(entry[0], False, None)
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry[1] == version:
+            return Lookup(entry[0], False, None)
+    return Lookup(None, True, acquire(key))
+
+
+def store(key, value, timeout, version=None, delta=0.0, lock=None):
+    """Сохранение пересчитанного значения и снятие блокировки lock.
+
+    Запись живёт в кэше дольше timeout на CACHE_STALE_TIMEOUT
+    секунд, чтобы её можно было отдавать во время пересчёта.
+    """
+
+    cache.set(
+        key,
+        (value, version, time.time() + timeout, delta),
+        timeout + settings.CACHE_STALE_TIMEOUT
+    )
+    release(key, lock)
+
+
+def get_or_refresh(key, compute, timeout, version=None, store_if=None):
+    """Значение key из кэша; при промахе - compute() в одном процессе.
+
+    store_if(value) решает, сохранять ли результат; несохранённый
+    результат всё равно возвращается вызвавшему.
+    """
+
+    value, refresh, lock = lookup(key, version)
+    if not refresh:
+        return value
+    start = time.perf_counter()
+    try:
+        value = compute()
+    except BaseException:
+        release(key, lock)
+        raise
+    if lock is not None and (store_if is None or store_if(value)):
+        store(key, value, timeout, version, time.perf_counter() - start, lock)
+    else:
+        release(key, lock)
+    return value
@@ -0,0 +1,69 @@
+"""Разделение чтений и записей между основной базой и репликой.
+
+Чтения идут в алиас REPLICA_ALIAS, если он настроен в DATABASES,
+записи - в основную базу. Реплика - второе соединение к тому же
+файлу SQLite с query_only, а не отстающая копия: прочитанное
+заполняет кэши страниц и объектов под текущим поколением контента,
+и устаревшие данные остались бы в них. После записи поток
+"прилипает" к основной базе до конца запроса, а
+ReplicaRoutingMiddleware продлевает это на DB_REPLICA_STICKY_SECONDS
+для сессии пользователя, чтобы он читал свои изменения из той же
+базы, в которую писал.
+"""
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = 'replica'
+
+# Сессии читаются только из основной базы: отставшая реплика
+# разлогинила бы пользователя сразу после входа.
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_state = threading.local()
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def pin_to_primary(pinned=True):
+    """Чтения текущего потока идут в основную базу."""
+
+    _state.pinned = pinned
+
+
+def has_written():
+    return getattr(_state, 'written', False)
+
+
+def reset(pinned=False):
+    """Начальное состояние потока перед обработкой запроса."""
+
+    _state.pinned = pinned
+    _state.written = False
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if (
+            REPLICA_ALIAS not in connections.databases
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+            or is_pinned()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in PRIMARY_ONLY_APPS:
+            _state.written = True
+            pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,64 @@
+"""Backend SQLite с настройкой соединения для многопроцессной работы.
+
+Встроенный backend открывает файл с журналом отката: пишущая
+транзакция блокирует читателей, а транзакция, начавшаяся с чтения
+(BEGIN DEFERRED), при попытке записи получает "database is locked",
+не дожидаясь busy_timeout. Этот backend выполняет PRAGMA из OPTIONS
+при открытии соединения и начинает transaction.atomic с
+BEGIN IMMEDIATE, так что писатели ждут друг друга в очереди.
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'core.db.sqlite3',
+            'NAME': 'db.sqlite3',
+            'CONN_MAX_AGE': 60,
+            'OPTIONS': {
+                'pragmas': {'journal_mode': 'wal', 'busy_timeout': 5000},
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+def apply_pragmas(connection, pragmas):
+    """Выполнение PRAGMA на открытом соединении sqlite3."""
+
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name} = {value}')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = dict(options.get('pragmas', {}))
+        self.transaction_mode = options.get('transaction_mode')
+        if self.transaction_mode is not None:
+            self.transaction_mode = self.transaction_mode.upper()
+            if self.transaction_mode not in TRANSACTION_MODES:
+                raise ImproperlyConfigured(
+                    f'transaction_mode must be one of {TRANSACTION_MODES}'
+                )
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        apply_pragmas(connection, self.pragmas)
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
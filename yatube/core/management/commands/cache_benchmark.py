@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from statistics import median
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache.sqlite import SQLiteCache
+
+PAYLOAD = 'x' * 2048
+
+
+def create_backends(directory):
+    return {
+        'locmem': LocMemCache('benchmark', {}),
+        'filebased': FileBasedCache(os.path.join(directory, 'files'), {}),
+        'sqlite': SQLiteCache(os.path.join(directory, 'cache.sqlite3'), {}),
+    }
+
+
+def read_shared_keys(args):
+    """Чтение ключей, записанных другим процессом (выполняется в воркере)."""
+
+    directory, name, keys = args
+    backend = create_backends(directory)[name]
+    return sum(backend.get(f'key-{i}') is not None for i in range(keys))
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает SQLiteCache с LocMemCache и FileBasedCache: '
+            'задержки операций и долю попаданий между процессами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=1000)
+        parser.add_argument('--reads', type=int, default=5)
+        parser.add_argument('--processes', type=int, default=4)
+
+    def measure(self, operation, keys):
+        timings = []
+        for i in range(keys):
+            start = time.perf_counter()
+            operation(f'key-{i}')
+            timings.append(time.perf_counter() - start)
+        return median(timings) * 1e6
+
+    def handle(self, *args, **options):
+        keys, reads = options['keys'], options['reads']
+        directory = tempfile.mkdtemp()
+        try:
+            backends = create_backends(directory)
+            self.stdout.write(
+                f'{"backend":<10} {"set, мкс":>10} {"get, мкс":>10} '
+                f'{"попадания в других процессах":>30}'
+            )
+            context = multiprocessing.get_context('spawn')
+            for name, backend in backends.items():
+                set_time = self.measure(
+                    lambda key: backend.set(key, PAYLOAD), keys
+                )
+                get_time = median(
+                    self.measure(backend.get, keys) for _ in range(reads)
+                )
+                with context.Pool(options['processes']) as pool:
+                    hits = pool.map(
+                        read_shared_keys,
+                        [(directory, name, keys)] * options['processes']
+                    )
+                ratio = sum(hits) / (keys * options['processes'])
+                self.stdout.write(
+                    f'{name:<10} {set_time:>10.1f} {get_time:>10.1f} '
+                    f'{ratio:>30.0%}'
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
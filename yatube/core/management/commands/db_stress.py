@@ -0,0 +1,179 @@
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db.sqlite3.base import apply_pragmas
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER NOT NULL, '
+    'pub_date REAL NOT NULL, text TEXT NOT NULL)',
+    'CREATE INDEX post_author_pub_date ON post (author_id, pub_date DESC)',
+    'CREATE INDEX post_pub_date ON post (pub_date DESC)',
+)
+AUTHORS = 100
+ROWS = 10000
+READ = 'SELECT id, author_id, text FROM post ORDER BY pub_date DESC LIMIT 10'
+READ_AUTHOR = (
+    'SELECT id, text FROM post WHERE author_id = ? '
+    'ORDER BY pub_date DESC LIMIT 10'
+)
+WRITE = 'INSERT INTO post (author_id, pub_date, text) VALUES (?, ?, ?)'
+
+
+def default_profile():
+    """Соединение встроенного backend Django: новое на каждый запрос."""
+
+    return {'pragmas': {}, 'transaction_mode': None, 'persistent': False}
+
+
+def tuned_profile():
+    """Соединение с настройками из settings.DATABASES['default']."""
+
+    database = settings.DATABASES['default']
+    options = database.get('OPTIONS', {})
+    return {
+        'pragmas': options.get('pragmas', {}),
+        'transaction_mode': options.get('transaction_mode'),
+        'persistent': database.get('CONN_MAX_AGE', 0) != 0,
+    }
+
+
+def create_database(path):
+    connection = sqlite3.connect(path, isolation_level=None)
+    for statement in SCHEMA:
+        connection.execute(statement)
+    now = time.time()
+    connection.execute('BEGIN')
+    connection.executemany(
+        WRITE,
+        (
+            (i % AUTHORS, now - i, 'x' * 200)
+            for i in range(ROWS)
+        )
+    )
+    connection.execute('COMMIT')
+    connection.close()
+
+
+class Worker(threading.Thread):
+    """Поток, имитирующий запросы одного воркера: чтение ленты или
+    транзакцию, которая сначала читает, а потом пишет (как post_create).
+    """
+
+    def __init__(self, path, profile, writer, deadline):
+        super().__init__(daemon=True)
+        self.path = path
+        self.profile = profile
+        self.writer = writer
+        self.deadline = deadline
+        self.operations = 0
+        self.errors = 0
+        self.connection = None
+
+    def connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False
+            )
+            apply_pragmas(self.connection, self.profile['pragmas'])
+        return self.connection
+
+    def release(self):
+        if not self.profile['persistent']:
+            self.connection.close()
+            self.connection = None
+
+    def read(self, connection):
+        connection.execute(READ).fetchall()
+        connection.execute(
+            READ_AUTHOR, (random.randrange(AUTHORS),)
+        ).fetchall()
+
+    def write(self, connection):
+        mode = self.profile['transaction_mode']
+        connection.execute(f'BEGIN {mode}' if mode else 'BEGIN')
+        try:
+            author_id = random.randrange(AUTHORS)
+            connection.execute(READ_AUTHOR, (author_id,)).fetchall()
+            connection.execute(WRITE, (author_id, time.time(), 'y' * 200))
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def run(self):
+        operation = self.write if self.writer else self.read
+        while time.monotonic() < self.deadline:
+            try:
+                operation(self.connect())
+                self.operations += 1
+            except sqlite3.OperationalError:
+                self.errors += 1
+            finally:
+                self.release()
+        if self.connection is not None:
+            self.connection.close()
+
+
+def run_stress(profile, readers=4, writers=2, seconds=3.0):
+    """Прогон нагрузки на отдельной копии базы.
+
+    Возвращает число чтений и записей в секунду и число ошибок
+    "database is locked".
+    """
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'stress.sqlite3')
+        create_database(path)
+        deadline = time.monotonic() + seconds
+        workers = [
+            Worker(path, profile, writer, deadline)
+            for writer in [False] * readers + [True] * writers
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return {
+        'reads': sum(w.operations for w in workers if not w.writer) / seconds,
+        'writes': sum(w.operations for w in workers if w.writer) / seconds,
+        'errors': sum(w.errors for w in workers),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест SQLite: конкурентные чтения и записи '
+            'со встроенными настройками и с настройками core.db.sqlite3.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"профиль":<10} {"чтений/с":>10} {"записей/с":>10} '
+            f'{"ошибок":>8}'
+        )
+        profiles = (('default', default_profile()), ('tuned', tuned_profile()))
+        for name, profile in profiles:
+            result = run_stress(
+                profile,
+                options['readers'],
+                options['writers'],
+                options['seconds'],
+            )
+            self.stdout.write(
+                f'{name:<10} {result["reads"]:>10.0f} '
+                f'{result["writes"]:>10.0f} {result["errors"]:>8}'
+            )
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from core import metrics
+
+
+class Command(BaseCommand):
+    help = 'Выводит перцентили метрик запросов по всем воркерам узла.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Удалить накопленные метрики после вывода.'
+        )
+
+    def handle(self, *args, **options):
+        views = metrics.collect()
+        self.stdout.write(
+            f'{"view":<28} {"n":>6} '
+            f'{"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+            f'{"db ms p95":>10} {"render p95":>11} {"queries p95":>12} '
+            f'{"cache hit":>10}'
+        )
+        for view_name, view in sorted(views.items()):
+            summary = view.summary()
+            lookups = summary['cache_hits'] + summary['cache_misses']
+            hit_ratio = (
+                f'{summary["cache_hits"] / lookups:.0%}' if lookups else '-'
+            )
+            self.stdout.write(
+                f'{view_name:<28} {summary["requests"]:>6} '
+                f'{summary["wall_ms"]["p50"]:>8g} '
+                f'{summary["wall_ms"]["p95"]:>8g} '
+                f'{summary["wall_ms"]["p99"]:>8g} '
+                f'{summary["db_ms"]["p95"]:>10g} '
+                f'{summary["render_ms"]["p95"]:>11g} '
+                f'{summary["queries"]["p95"]:>12g} '
+                f'{hit_ratio:>10}'
+            )
+        if options['reset']:
+            metrics.reset()
@@ -0,0 +1,254 @@
+"""Гистограммы времени обработки запросов по именам URL.
+
+Middleware core.middleware.PerformanceMiddleware собирает для
+каждого запроса время ответа, число и время запросов к БД, время
+рендера шаблонов и попадания в кэш, а затем добавляет их в
+гистограммы процесса. Раз в METRICS_FLUSH_INTERVAL секунд процесс
+сохраняет свои гистограммы в METRICS_DIR/<pid>.json; collect()
+объединяет файлы всех воркеров узла.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+# Границы корзин: миллисекунды для времени, штуки для запросов к БД.
+TIME_BUCKETS = (
+    0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000
+)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233)
+METRIC_BUCKETS = {
+    'wall_ms': TIME_BUCKETS,
+    'db_ms': TIME_BUCKETS,
+    'render_ms': TIME_BUCKETS,
+    'queries': COUNT_BUCKETS,
+}
+COUNTERS = ('cache_hits', 'cache_misses')
+
+_lock = threading.Lock()
+_local = threading.local()
+_views = {}
+_last_flush = 0
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами."""
+
+    def __init__(self, bounds, counts=None, total=0.0):
+        self.bounds = tuple(bounds)
+        self.counts = list(counts or [0] * (len(self.bounds) + 1))
+        self.total = total
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.total += other.total
+
+    def percentile(self, q):
+        """Верхняя граница корзины, в которую попадает q-й перцентиль."""
+
+        rank = q / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else float(
+                    'inf'
+                )
+        return 0.0
+
+    def to_dict(self):
+        return {'counts': self.counts, 'total': self.total}
+
+    @classmethod
+    def from_dict(cls, bounds, data):
+        return cls(bounds, data['counts'], data['total'])
+
+
+class ViewMetrics:
+    """Гистограммы и счётчики одного имени URL."""
+
+    def __init__(self):
+        self.histograms = {
+            name: Histogram(bounds) for name, bounds in METRIC_BUCKETS.items()
+        }
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def merge(self, other):
+        for name, histogram in other.histograms.items():
+            self.histograms[name].merge(histogram)
+        for name, value in other.counters.items():
+            self.counters[name] += value
+
+    def to_dict(self):
+        return {
+            'histograms': {
+                name: histogram.to_dict()
+                for name, histogram in self.histograms.items()
+            },
+            'counters': self.counters,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        metrics = cls()
+        for name, histogram in data['histograms'].items():
+            metrics.histograms[name] = Histogram.from_dict(
+                METRIC_BUCKETS[name], histogram
+            )
+        metrics.counters.update(data['counters'])
+        return metrics
+
+    def summary(self):
+        result = {'requests': self.histograms['wall_ms'].count}
+        for name, histogram in self.histograms.items():
+            result[name] = {
+                'p50': histogram.percentile(50),
+                'p95': histogram.percentile(95),
+                'p99': histogram.percentile(99),
+                'mean': histogram.total / (histogram.count or 1),
+            }
+        result.update(self.counters)
+        return result
+
+
+class RequestMetrics:
+    """Измерения текущего запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.render_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def start_request():
+    _local.request = RequestMetrics()
+    return _local.request
+
+
+def current_request():
+    return getattr(_local, 'request', None)
+
+
+def record_cache_access(hit):
+    metrics = current_request()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+def finish_request(view_name, wall_time):
+    """Добавление измерений запроса в гистограммы процесса."""
+
+    metrics = _local.request
+    _local.request = None
+    with _lock:
+        view = _views.setdefault(view_name, ViewMetrics())
+        view.histograms['wall_ms'].observe(wall_time * 1000)
+        view.histograms['db_ms'].observe(metrics.db_time * 1000)
+        view.histograms['render_ms'].observe(metrics.render_time * 1000)
+        view.histograms['queries'].observe(metrics.queries)
+        view.counters['cache_hits'] += metrics.cache_hits
+        view.counters['cache_misses'] += metrics.cache_misses
+    maybe_flush()
+
+
+def snapshot():
+    with _lock:
+        return {name: view.to_dict() for name, view in _views.items()}
+
+
+def maybe_flush(force=False):
+    """Сохранение гистограмм процесса для объединения с другими воркерами."""
+
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    path = os.path.join(settings.METRICS_DIR, f'{os.getpid()}.json')
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(snapshot(), file)
+    os.replace(temporary, path)
+
+
+def _is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю
+        pass
+    return True
+
+
+def collect():
+    """Гистограммы всех воркеров узла, объединённые по именам URL.
+
+    Файлы завершившихся процессов удаляются: иначе после каждого
+    перезапуска воркеров каталог рос бы, а их метрики учитывались
+    бы вечно.
+    """
+
+    maybe_flush(force=True)
+    views = {}
+    for name in os.listdir(settings.METRICS_DIR):
+        if not name.endswith('.json'):
+            continue
+        pid = name[:-len('.json')]
+        if pid.isdigit() and not _is_running(int(pid)):
+            try:
+                os.remove(os.path.join(settings.METRICS_DIR, name))
+            except OSError:
+                pass
+            continue
+        try:
+            with open(os.path.join(settings.METRICS_DIR, name)) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            continue
+        for view_name, view in data.items():
+            views.setdefault(view_name, ViewMetrics()).merge(
+                ViewMetrics.from_dict(view)
+            )
+    return views
+
+
+def reset():
+    """Удаление накопленных метрик процесса и файлов всех воркеров."""
+
+    with _lock:
+        _views.clear()
+    if not os.path.isdir(settings.METRICS_DIR):
+        return
+    for name in os.listdir(settings.METRICS_DIR):
+        if name.endswith('.json'):
+            os.remove(os.path.join(settings.METRICS_DIR, name))
@@ -0,0 +1,263 @@
+import mimetypes
+import os
+import posixpath
+import time
+from contextlib import ExitStack
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.db import connections
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.utils.module_loading import import_string
+from django.views.static import was_modified_since
+
+from . import metrics
+from .cache import stampede
+from .db import routers
+from .staticfiles import VARIANT_SUFFIXES
+
+
+class PerformanceMiddleware:
+    """Сбор метрик запроса в гистограммы по имени URL (core.metrics)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        request_metrics = metrics.start_request()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(
+                        request_metrics.execute_wrapper
+                    )
+                )
+            response = self.get_response(request)
+        match = request.resolver_match
+        metrics.finish_request(
+            match.view_name if match else 'unresolved',
+            time.perf_counter() - start
+        )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Чтения после записи идут в основную базу (core.db.routers).
+
+    Ставится после SessionMiddleware: отметка о записи сохраняется
+    в сессии до того, как та будет записана. Без cookie сессии
+    отметки быть не может, и сессия не читается: иначе каждый ответ
+    получал бы Vary: Cookie.
+    """
+
+    SESSION_KEY = '_db_primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if routers.REPLICA_ALIAS not in connections.databases:
+            return self.get_response(request)
+        routers.reset(pinned=self.is_pinned(request))
+        try:
+            response = self.get_response(request)
+            if routers.has_written():
+                request.session[self.SESSION_KEY] = (
+                    time.time() + settings.DB_REPLICA_STICKY_SECONDS
+                )
+        finally:
+            routers.reset()
+        return response
+
+    def is_pinned(self, request):
+        if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            return False
+        return request.session.get(self.SESSION_KEY, 0) > time.time()
+
+
+class StaticFilesMiddleware:
+    """Отдача собранной статики из STATIC_ROOT без похода во view.
+
+    Файлы с хешем в имени (из манифеста collectstatic) отдаются
+    с заголовком immutable на год, остальные - на короткий срок
+    с проверкой If-Modified-Since. Если клиент принимает br или gzip
+    и рядом лежит сжатый вариант, отдаётся он.
+    """
+
+    IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+    def __init__(self, get_response):
+        if not settings.STATIC_ROOT or not settings.STATIC_URL:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.immutable = frozenset(
+            getattr(staticfiles_storage, 'hashed_files', {}).values()
+        )
+
+    def __call__(self, request):
+        path = request.path_info
+        if request.method in ('GET', 'HEAD') and path.startswith(self.prefix):
+            response = self.serve(request, path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def find(self, name):
+        try:
+            full_path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        return full_path if os.path.isfile(full_path) else None
+
+    def choose_variant(self, request, full_path):
+        accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        accepted = {
+            part.split(';')[0].strip().lower() for part in accepted.split(',')
+        }
+        for encoding, suffix in VARIANT_SUFFIXES:
+            if encoding in accepted and os.path.isfile(full_path + suffix):
+                return encoding, full_path + suffix
+        return None, full_path
+
+    def serve(self, request, name):
+        name = posixpath.normpath(name).lstrip('/')
+        full_path = self.find(name)
+        if full_path is None:
+            return None
+        stat = os.stat(full_path)
+        immutable = name in self.immutable
+        if not immutable and not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat.st_mtime, stat.st_size
+        ):
+            return HttpResponseNotModified()
+        encoding, served_path = self.choose_variant(request, full_path)
+        content_type, _ = mimetypes.guess_type(full_path)
+        response = FileResponse(
+            open(served_path, 'rb'),
+            content_type=content_type or 'application/octet-stream'
+        )
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = (
+            self.IMMUTABLE_CACHE_CONTROL if immutable else 'public, max-age=60'
+        )
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class AnonymousPageCacheMiddleware:
+    """Готовые страницы публичных разделов для анонимных посетителей.
+
+    Кэшируются ответы 200 на GET и HEAD к URL из пространств имён
+    ANONYMOUS_CACHE_NAMESPACES. Страница хранится с версией контента
+    (функция ANONYMOUS_CACHE_VERSION), поэтому запись поста,
+    комментария или подписки сразу делает страницы устаревшими;
+    пересчитывает устаревшую страницу один запрос (core.cache.stampede).
+    Ставится после AuthenticationMiddleware: авторизованные
+    пользователи и ответы, которые ставят cookie или используют
+    CSRF-токен, в кэш не попадают.
+    """
+
+    KEY_PREFIX = 'anonymous_page'
+    IGNORED_PARAMS_PREFIX = 'utm_'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.namespaces = frozenset(settings.ANONYMOUS_CACHE_NAMESPACES)
+        self.get_version = import_string(settings.ANONYMOUS_CACHE_VERSION)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        key = getattr(request, '_anonymous_cache_key', None)
+        if key is None:
+            return response
+        lock = request._anonymous_cache_lock
+        if self.can_store(request, response):
+            stampede.store(
+                key,
+                response,
+                settings.ANONYMOUS_CACHE_TIMEOUT,
+                version=request._anonymous_cache_version,
+                delta=time.perf_counter() - request._anonymous_cache_start,
+                lock=lock
+            )
+        else:
+            stampede.release(key, lock)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self.can_serve(request):
+            return None
+        key = self.cache_key(request)
+        # версия берётся до выполнения view: запись во время рендера
+        # не должна пометить старую страницу новой версией
+        version = self.get_version()
+        response, refresh, lock = stampede.lookup(key, version)
+        if refresh:
+            if lock is not None:
+                request._anonymous_cache_key = key
+                request._anonymous_cache_lock = lock
+                request._anonymous_cache_version = version
+                request._anonymous_cache_start = time.perf_counter()
+            return None
+        return get_conditional_response(
+            request,
+            etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(
+                response.get('Last-Modified', '')
+            ),
+            response=response
+        )
+
+    def can_serve(self, request):
+        match = request.resolver_match
+        return (
+            request.method in ('GET', 'HEAD')
+            and match is not None
+            and match.namespace in self.namespaces
+            and not request.user.is_authenticated
+        )
+
+    def can_store(self, request, response):
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED')
+        )
+
+    def normalized_query(self, request):
+        """Строка запроса без пустых и рекламных параметров и page=1.
+
+        Параметры сортируются, поэтому ?b=1&a=2 и ?a=2&b=1 или
+        ?page=1 и адрес без параметров попадают в один ключ.
+        """
+
+        params = sorted(
+            (name, value)
+            for name, values in request.GET.lists()
+            for value in values
+            if value
+            and not name.startswith(self.IGNORED_PARAMS_PREFIX)
+            and not (name == 'page' and value == '1')
+        )
+        return urlencode(params)
+
+    def cache_key(self, request):
+        query = self.normalized_query(request)
+        url = md5(
+            f'{request.get_host()}{request.path}?{query}'.encode()
+        ).hexdigest()
+        return f'{self.KEY_PREFIX}:{url}'
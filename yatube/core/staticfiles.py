@@ -0,0 +1,75 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Расширения текстовых файлов, для которых имеет смысл сжатие
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.svg', '.ico', '.txt', '.json', '.map', '.html'
+)
+
+
+def gzip_compress(content):
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def brotli_compress(content):
+    return brotli.compress(content, mode=brotli.MODE_TEXT)
+
+
+# Варианты в порядке предпочтения: (Content-Encoding, суффикс, функция)
+ENCODINGS = [('gzip', '.gz', gzip_compress)]
+if brotli is not None:
+    ENCODINGS.insert(0, ('br', '.br', brotli_compress))
+
+# Суффиксы всех вариантов, которые может отдать StaticFilesMiddleware
+VARIANT_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хранилище статики с хешем в имени и сжатыми копиями файлов.
+
+    collectstatic кладёт рядом с каждым текстовым файлом варианты
+    .gz (и .br, если установлен brotli), чтобы не сжимать их
+    на каждый запрос. Пока манифест не собран, url() отдаёт
+    исходные имена вместо ошибки.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed_names = []
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if not isinstance(processed, Exception):
+                processed_names.extend((name, hashed_name))
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in dict.fromkeys(processed_names):
+            if name and name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        """Запись сжатых вариантов файла, если они меньше исходного."""
+
+        with self.open(name) as original:
+            content = original.read()
+        for encoding, suffix, compress in ENCODINGS:
+            compressed = compress(content)
+            variant = name + suffix
+            if self.exists(variant):
+                self.delete(variant)
+            if len(compressed) < len(content):
+                self._save(variant, ContentFile(compressed))
@@ -0,0 +1,37 @@
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django
+
+from . import metrics
+
+
+class Template(django.Template):
+
+    def render(self, context=None, request=None):
+        request_metrics = metrics.current_request()
+        if request_metrics is None:
+            return super().render(context, request)
+        # Учитывается только внешний рендер: шаблоны, отрендеренные
+        # внутри него (render_to_string в тегах), уже входят в его время.
+        request_metrics.render_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            request_metrics.render_depth -= 1
+            if not request_metrics.render_depth:
+                request_metrics.render_time += time.perf_counter() - start
+
+
+class DjangoTemplates(django.DjangoTemplates):
+    """DjangoTemplates, измеряющий время рендера для core.metrics."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django.reraise(exc, self)
@@ -0,0 +1,39 @@
+"""Запуск тестов с собственным кэшем и без сбора метрик.
+
+Тесты очищают кэш, поэтому на время прогона CACHES указывает
+на файл во временном каталоге, который удаляется после тестов.
+Метрики запросов выключены, а их каталог тоже перенесён туда:
+тесты метрик включают их сами и не пишут в общий каталог узла.
+"""
+import shutil
+import tempfile
+from os import path
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner, переносящий кэш и метрики во временный каталог."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.temp_dir = tempfile.mkdtemp(prefix='yatube-test-')
+        self.test_settings = override_settings(
+            CACHES={
+                **settings.CACHES,
+                'default': {
+                    **settings.CACHES['default'],
+                    'LOCATION': path.join(self.temp_dir, 'cache.sqlite3'),
+                },
+            },
+            METRICS_ENABLED=False,
+            METRICS_DIR=path.join(self.temp_dir, 'metrics'),
+        )
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,83 @@
+# core/tests/test_cache.py
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from core.cache.sqlite import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_basic_operations(self):
+        """set/get/add/incr/delete работают как у встроенных backend"""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('new', 'value'))
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2}
+        )
+        self.cache.delete_many(['a', 'b'])
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.cache.has_key('a'))
+
+    def test_expired_entries_are_misses(self):
+        """Просроченные записи не возвращаются и могут быть заменены"""
+        self.cache.set('key', 'value', timeout=0)
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', 'value', timeout=None)
+        self.assertTrue(self.cache.has_key('key'))
+
+    def test_entries_are_shared_between_instances(self):
+        """Разные экземпляры (процессы) видят общие данные"""
+        other = SQLiteCache(self.location, {})
+        self.cache.set('shared', 'value')
+        self.assertEqual(other.get('shared'), 'value')
+        other.clear()
+        self.assertIsNone(self.cache.get('shared'))
+
+    def test_lru_eviction_by_size(self):
+        """При превышении MAX_SIZE вытесняются давно не читавшиеся записи"""
+        cache = SQLiteCache(
+            self.location, {'OPTIONS': {'MAX_SIZE': 10 * 1024}}
+        )
+        payload = 'x' * 1024
+        for i in range(8):
+            cache.set(f'key-{i}', payload)
+        time.sleep(1.1)
+        cache.get('key-0')
+        for i in range(8, 12):
+            cache.set(f'key-{i}', payload)
+        self.assertIsNotNone(cache.get('key-0'))
+        self.assertIsNone(cache.get('key-1'))
+        self.assertIsNotNone(cache.get('key-11'))
+
+
+class TestRunnerCacheTests(SimpleTestCase):
+
+    def test_tests_use_temporary_cache(self):
+        """Тесты работают с кэшем во временном каталоге"""
+        location = caches['default']._path
+        self.assertTrue(location.startswith(tempfile.gettempdir()))
+        self.assertNotEqual(
+            location, os.path.join(settings.BASE_DIR, 'cache.sqlite3')
+        )
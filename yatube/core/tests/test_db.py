@@ -0,0 +1,145 @@
+# core/tests/test_db.py
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from core.db import routers
+from core.db.sqlite3.base import DatabaseWrapper
+from core.middleware import ReplicaRoutingMiddleware
+from posts.models import Post
+from core.management.commands.db_stress import run_stress, tuned_profile
+
+
+class SQLiteBackendTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'db.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def create_wrapper(self, **options):
+        settings_dict = dict(connections['default'].settings_dict)
+        settings_dict.update(NAME=self.path, OPTIONS=options)
+        wrapper = DatabaseWrapper(settings_dict, alias='stress')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_on_connect(self):
+        """PRAGMA из OPTIONS выполняются при открытии соединения"""
+        wrapper = self.create_wrapper(pragmas={
+            'journal_mode': 'wal',
+            'synchronous': 'normal',
+            'busy_timeout': 1234,
+        })
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 1234)
+
+    def test_atomic_takes_write_lock_immediately(self):
+        """transaction_mode=IMMEDIATE сразу берёт блокировку на запись"""
+        wrapper = self.create_wrapper(transaction_mode='immediate')
+        wrapper.ensure_connection()
+        wrapper._start_transaction_under_autocommit()
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        with self.assertRaises(sqlite3.OperationalError):
+            other.execute('BEGIN IMMEDIATE')
+        wrapper.connection.execute('ROLLBACK')
+
+    def test_unknown_transaction_mode(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.create_wrapper(transaction_mode='LAZY')
+
+    def test_tuned_profile_has_no_lock_errors(self):
+        """Под конкурентной нагрузкой писатели ждут друг друга, а не
+        получают "database is locked"
+        """
+        result = run_stress(
+            tuned_profile(), readers=2, writers=2, seconds=0.5
+        )
+        self.assertEqual(result['errors'], 0)
+        self.assertGreater(result['writes'], 0)
+        self.assertGreater(result['reads'], 0)
+
+
+REPLICA = {'replica': {'ENGINE': 'core.db.sqlite3', 'NAME': 'replica'}}
+
+
+@mock.patch.dict(connections.databases, REPLICA)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        routers.reset()
+        self.addCleanup(routers.reset)
+
+    def test_reads_go_to_replica_until_write(self):
+        """Чтения идут в реплику, после записи - в основную базу"""
+        self.assertEqual(router.db_for_read(Post), 'replica')
+        self.assertEqual(router.db_for_read(Session), 'default')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_session_writes_do_not_pin(self):
+        router.db_for_write(Session)
+        self.assertFalse(routers.has_written())
+        self.assertEqual(router.db_for_read(Post), 'replica')
+
+    def test_reads_inside_transaction_use_primary(self):
+        with mock.patch.object(
+            connections['default'], 'in_atomic_block', True
+        ):
+            self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+
+    def test_session_sticks_to_primary_after_write(self):
+        """После записи запросы той же сессии читают основную базу"""
+        reads = []
+
+        def view(request):
+            reads.append(router.db_for_read(Post))
+            if request.method == 'POST':
+                router.db_for_write(Post)
+            return HttpResponse()
+
+        request_factory = RequestFactory()
+        middleware = ReplicaRoutingMiddleware(view)
+        request = request_factory.post('/')
+        request.session = SessionStore()
+        middleware(request)
+        self.assertEqual(routers.is_pinned(), False)
+        next_request = request_factory.get('/')
+        next_request.COOKIES[settings.SESSION_COOKIE_NAME] = 'session'
+        next_request.session = request.session
+        middleware(next_request)
+        other_request = request_factory.get('/')
+        other_request.session = SessionStore()
+        middleware(other_request)
+        self.assertEqual(reads, ['replica', 'default', 'replica'])
+
+    def test_anonymous_request_does_not_read_session(self):
+        """Без cookie сессии она не читается и не добавляет Vary"""
+        middleware = ReplicaRoutingMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        middleware(request)
+        self.assertFalse(request.session.accessed)
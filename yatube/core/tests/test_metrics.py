@@ -0,0 +1,81 @@
+# core/tests/test_metrics.py
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from core.metrics import Histogram, TIME_BUCKETS, ViewMetrics
+
+User = get_user_model()
+
+TEMP_METRICS_DIR = tempfile.mkdtemp()
+
+
+class HistogramTests(SimpleTestCase):
+
+    def test_percentiles(self):
+        """Перцентили берутся по верхним границам корзин"""
+        histogram = Histogram(TIME_BUCKETS)
+        for value in [0.3] * 50 + [15] * 45 + [700] * 5:
+            histogram.observe(value)
+        self.assertEqual(histogram.percentile(50), 0.5)
+        self.assertEqual(histogram.percentile(95), 20)
+        self.assertEqual(histogram.percentile(99), 1000)
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_DIR=TEMP_METRICS_DIR)
+class PerformanceMiddlewareTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        metrics.reset()
+        cache.clear()
+
+    def test_requests_are_recorded_per_view(self):
+        """Запросы учитываются по имени URL вместе с запросами к БД"""
+        self.client.get(reverse('posts:posts_index'))
+        self.client.get(reverse('posts:posts_index'))
+        summary = metrics.collect()['posts:posts_index'].summary()
+        self.assertEqual(summary['requests'], 2)
+        self.assertGreater(summary['queries']['p99'], 0)
+        self.assertGreater(summary['cache_hits'], 0)
+        output = StringIO()
+        call_command('perf_report', stdout=output)
+        self.assertIn('posts:posts_index', output.getvalue())
+
+    def test_files_of_finished_workers_are_pruned(self):
+        """Файлы завершившихся воркеров удаляются при сборе метрик"""
+        worker = subprocess.Popen([sys.executable, '-c', ''])
+        worker.wait()
+        stale = os.path.join(TEMP_METRICS_DIR, f'{worker.pid}.json')
+        with open(stale, 'w') as file:
+            json.dump({'posts:posts_index': ViewMetrics().to_dict()}, file)
+        self.client.get(reverse('posts:posts_index'))
+        summary = metrics.collect()['posts:posts_index'].summary()
+        self.assertEqual(summary['requests'], 1)
+        self.assertFalse(os.path.exists(stale))
+
+    def test_metrics_endpoint_is_staff_only(self):
+        """Эндпоинт метрик доступен только персоналу"""
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        self.client.get(reverse('posts:posts_index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('posts:posts_index', response.json())
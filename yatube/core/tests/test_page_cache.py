@@ -0,0 +1,102 @@
+# core/tests/test_page_cache.py
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import views
+from posts.caching import bump_generation
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='test_group',
+            slug='test-group',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Post to test the anonymous page cache',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = (
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:search') + '?q=Post',
+            reverse('about:author'),
+        )
+
+    def test_public_pages_are_served_from_cache(self):
+        """Повторный анонимный запрос не доходит до view и базы"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(0):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, first.content)
+                self.assertEqual(response.templates, [])
+
+    def test_keys_are_normalized(self):
+        """Порядок параметров, page=1 и utm_* не меняют ключ"""
+        url = reverse('posts:search')
+        self.client.get(url + '?q=Post&page=1')
+        for query in ('?q=Post', '?utm_source=mail&q=Post&page=1'):
+            with self.subTest(query=query):
+                with self.assertNumQueries(0):
+                    self.client.get(url + query)
+
+    def test_authenticated_users_bypass_cache(self):
+        """Авторизованный пользователь не получает анонимную страницу"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.client.get(url)
+        authorized_client = Client()
+        authorized_client.force_login(self.user)
+        response = authorized_client.get(url)
+        self.assertContains(response, 'Редактировать запись')
+
+    def test_writes_invalidate_pages(self):
+        """После нового комментария страница поста строится заново"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.client.get(url)
+        Comment.objects.create(
+            author=self.user, post=self.post, text='Fresh comment'
+        )
+        self.assertContains(self.client.get(url), 'Fresh comment')
+
+    def test_cached_page_answers_conditional_requests(self):
+        """Закэшированная страница отвечает 304 по ETag"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_during_render_keeps_page_stale(self):
+        """Страница, во время рендера которой была запись, устаревает"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        get_comments_page = views.get_comments_page
+
+        def write_while_rendering(*args, **kwargs):
+            bump_generation()
+            return get_comments_page(*args, **kwargs)
+
+        with mock.patch.object(
+            views, 'get_comments_page', write_while_rendering
+        ):
+            self.client.get(url)
+        response = self.client.get(url)
+        self.assertNotEqual(response.templates, [])
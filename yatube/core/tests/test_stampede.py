@@ -0,0 +1,97 @@
+# core/tests/test_stampede.py
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import stampede
+
+
+class StampedeTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f'value {self.calls}'
+
+    def test_value_is_computed_once(self):
+        """Пересчёт выполняется только при промахе"""
+        for _ in range(3):
+            self.assertEqual(
+                stampede.get_or_refresh('key', self.compute, 60, version=1),
+                'value 1'
+            )
+        self.assertEqual(self.calls, 1)
+        self.assertIsNone(cache.get(stampede.lock_key('key')))
+
+    def test_stale_value_is_served_while_locked(self):
+        """Пока другой процесс пересчитывает, отдаётся прежняя версия"""
+        stampede.get_or_refresh('key', self.compute, 60, version=1)
+        lock = stampede.acquire('key')
+        self.assertEqual(
+            stampede.get_or_refresh('key', self.compute, 60, version=2),
+            'value 1'
+        )
+        stampede.release('key', lock)
+        self.assertEqual(
+            stampede.get_or_refresh('key', self.compute, 60, version=2),
+            'value 2'
+        )
+
+    def test_early_refresh_before_expiry(self):
+        """Долго считающаяся запись пересчитывается до истечения срока"""
+        stampede.store('key', 'old', 60, version=1, delta=30)
+        with mock.patch('random.random', return_value=0.5):
+            self.assertEqual(
+                stampede.get_or_refresh('key', self.compute, 60, version=1),
+                'old'
+            )
+        with mock.patch('random.random', return_value=0.99):
+            self.assertEqual(
+                stampede.get_or_refresh('key', self.compute, 60, version=1),
+                'value 1'
+            )
+
+    @override_settings(CACHE_LOCK_WAIT=1)
+    def test_waits_for_value_computed_elsewhere(self):
+        """Без прежней версии запрос ждёт результат другого процесса"""
+        stampede.acquire('key')
+
+        def other_worker_finishes(seconds):
+            stampede.store('key', 'computed elsewhere', 60, version=1)
+
+        with mock.patch.object(time, 'sleep', other_worker_finishes):
+            self.assertEqual(
+                stampede.get_or_refresh('key', self.compute, 60, version=1),
+                'computed elsewhere'
+            )
+        self.assertEqual(self.calls, 0)
+
+    def test_lock_is_released_without_storing(self):
+        """Ошибка или отказ от сохранения снимают блокировку"""
+        with self.assertRaises(ZeroDivisionError):
+            stampede.get_or_refresh('key', lambda: 1 / 0, 60)
+        self.assertIsNone(cache.get(stampede.lock_key('key')))
+        stampede.get_or_refresh(
+            'key', self.compute, 60, store_if=lambda value: False
+        )
+        self.assertIsNone(cache.get(stampede.lock_key('key')))
+        self.assertIsNone(cache.get('key'))
+
+    @override_settings(CACHE_LOCK_WAIT=0)
+    def test_timed_out_waiter_keeps_foreign_lock(self):
+        """Не дождавшийся процесс не сохраняет значение и не снимает
+        чужую блокировку"""
+        lock = stampede.acquire('key')
+        self.assertEqual(
+            stampede.get_or_refresh('key', self.compute, 60, version=1),
+            'value 1'
+        )
+        self.assertEqual(cache.get(stampede.lock_key('key')), lock)
+        self.assertIsNone(cache.get('key'))
+        stampede.release('key', 'other')
+        self.assertEqual(cache.get(stampede.lock_key('key')), lock)
@@ -0,0 +1,98 @@
+# core/tests/test_static.py
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import SimpleTestCase, override_settings
+
+from core import metrics
+from core.middleware import StaticFilesMiddleware
+
+STATIC_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(STATIC_ROOT=STATIC_ROOT)
+class StaticFilesTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        """collectstatic создаёт файлы с хешем и их сжатые копии"""
+        hashed = staticfiles_storage.stored_name('css/bootstrap.min.css')
+        self.assertNotEqual(hashed, 'css/bootstrap.min.css')
+        path = os.path.join(STATIC_ROOT, hashed)
+        with open(path, 'rb') as original, gzip.open(path + '.gz') as packed:
+            self.assertEqual(packed.read(), original.read())
+        self.assertFalse(
+            os.path.exists(os.path.join(STATIC_ROOT, 'img/logo.png.gz'))
+        )
+
+    def test_hashed_file_is_immutable_and_negotiated(self):
+        """Файл с хешем отдаётся сжатым и с кэшированием на год"""
+        url = static('css/bootstrap.min.css')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(
+            response['Cache-Control'],
+            StaticFilesMiddleware.IMMUTABLE_CACHE_CONTROL
+        )
+        self.assertIn('Accept-Encoding', response['Vary'])
+        response.close()
+
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response.close()
+
+    def test_unhashed_file_is_revalidated(self):
+        """Файл без хеша кэшируется ненадолго и отвечает 304"""
+        response = self.client.get('/static/css/bootstrap.min.css')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        last_modified = response['Last-Modified']
+        response.close()
+        response = self.client.get(
+            '/static/css/bootstrap.min.css',
+            HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_and_unsafe_paths_fall_through(self):
+        """Отсутствующие файлы и выход за STATIC_ROOT не отдаются"""
+        for path in ('/static/missing.css', '/static/../settings.py'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 404)
+
+    def test_static_hits_are_not_recorded_as_views(self):
+        """Статика отдаётся до сбора метрик и не попадает в unresolved"""
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir, ignore_errors=True)
+        with override_settings(METRICS_ENABLED=True, METRICS_DIR=metrics_dir):
+            metrics.reset()
+            response = self.client.get(static('css/bootstrap.min.css'))
+            response.close()
+            self.assertNotIn('unresolved', metrics.collect())
+
+
+class ManifestFallbackTests(SimpleTestCase):
+
+    @override_settings(STATIC_ROOT=tempfile.gettempdir() + '/no-manifest')
+    def test_url_without_manifest(self):
+        """Без собранного манифеста static отдаёт исходное имя"""
+        self.assertEqual(
+            static('css/bootstrap.min.css'), '/static/css/bootstrap.min.css'
+        )
+
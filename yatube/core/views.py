@@ -1,6 +1,10 @@
+from django.contrib.auth.decorators import user_passes_test
+from django.http import JsonResponse
 from django.shortcuts import render
 from os import path
 
+from . import metrics
+
 
 def page_not_found(request, exception):
     return render(
@@ -26,3 +30,13 @@ def internal_server_error_view(request):
         path.join('core', '500.html'),
         status=500
     )
+
+
+@user_passes_test(lambda user: user.is_staff)
+def metrics_view(request):
+    """Перцентили метрик запросов по всем воркерам узла."""
+
+    return JsonResponse({
+        view_name: view.summary()
+        for view_name, view in sorted(metrics.collect().items())
+    })
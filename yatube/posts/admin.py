@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Post, Group
+from .search import search_posts
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -17,6 +18,29 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_related()
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """Список групп для list_editable выбирается один раз на запрос."""
+
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        if db_field.name == 'group' and formfield is not None:
+            choices = getattr(request, '_group_choices', None)
+            if choices is None:
+                choices = request._group_choices = list(formfield.choices)
+            formfield.choices = choices
+        return formfield
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по тексту через полнотекстовый индекс."""
+
+        if not search_term:
+            return queryset, False
+        return search_posts(search_term, queryset), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -0,0 +1,111 @@
+import time
+from functools import partial, wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from core.cache.stampede import get_or_refresh
+
+GENERATION_KEY = 'posts:generation'
+
+
+def get_generation():
+    """Текущее поколение контента.
+
+    Меняется при любой записи, влияющей на ленты, поэтому всё,
+    что закэшировано с ключом старого поколения, устаревает сразу.
+    Начальное значение берётся от времени, чтобы после вытеснения
+    ключа из кэша поколения не повторялись.
+    """
+
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+
+
+def invalidate_content():
+    """Новое поколение сразу и ещё раз после фиксации транзакции.
+
+    Между записью и фиксацией другой запрос может построить
+    страницу по старым данным и сохранить её с новым поколением.
+    """
+
+    bump_generation()
+    transaction.on_commit(bump_generation)
+
+
+def page_cache_key(request, key_prefix):
+    user = request.user.pk if request.user.is_authenticated else 'anon'
+    url = md5(request.get_full_path().encode()).hexdigest()
+    return f'{key_prefix}:{user}:{url}'
+
+
+def is_cacheable_response(response):
+    return response.status_code == 200 and not response.cookies
+
+
+def cache_feed_page(key_prefix, timeout=None):
+    """Кэширование страницы ленты до следующей записи.
+
+    В отличие от cache_page, страница хранится с версией - поколением
+    контента, поэтому её можно держать часами: после создания, правки
+    или удаления поста, комментария, группы или подписки страница
+    строится заново. Пересчёт выполняет один запрос, остальные
+    в это время получают прежнюю версию (core.cache.stampede).
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            return get_or_refresh(
+                page_cache_key(request, key_prefix),
+                partial(view, request, *args, **kwargs),
+                timeout or settings.POSTS_PAGE_CACHE_TIMEOUT,
+                version=get_generation(),
+                store_if=is_cacheable_response
+            )
+        return wrapper
+    return decorator
+
+
+def conditional_page(view):
+    """Ответ 304 до выполнения view, если страница у клиента актуальна.
+
+    ETag составляется из поколения контента и пользователя, поскольку
+    страница зависит от того, кто её смотрит, и из CSRF-токена: после
+    повторного входа токен меняется, и форма со старым токеном
+    из кэша браузера вернула бы 403. Last-Modified не отправляется:
+    удаления, переименования и подписки не меняют дат постов, и по
+    нему клиент получал бы 304 на изменённую страницу.
+    """
+
+    def etag_func(request, *args, **kwargs):
+        user = request.user.pk if request.user.is_authenticated else 'anon'
+        # META['CSRF_COOKIE'] в отличие от get_token() не требует
+        # выставлять cookie на страницах без форм
+        csrf = md5(request.META.get('CSRF_COOKIE', '').encode()).hexdigest()
+        return f'{get_generation()}-{user}-{csrf[:8]}'
+
+    conditional_view = condition(etag_func=etag_func)(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        patch_cache_control(response, no_cache=True)
+        return response
+    return wrapper
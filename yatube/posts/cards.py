@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .caching import invalidate_content
+from .models import Group, Post
+from .thumbnails import get_ready_srcset
+
+User = get_user_model()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+# Поля связанных моделей, которые выводятся в карточке поста
+CARD_FIELDS = {
+    Group: ('title', 'slug'),
+    User: ('username', 'first_name', 'last_name'),
+}
+
+
+def card_key(post, **options):
+    flags = ''.join(str(int(value)) for _, value in sorted(options.items()))
+    return f'post_card:{post.pk}:{post.updated.timestamp()}:{flags}'
+
+
+def render_card(post, **options):
+    """HTML карточки поста из кэша фрагментов.
+
+    Ключ включает время изменения поста, поэтому правка поста,
+    его группы или имени автора (см. touch_posts) даёт новый ключ.
+    Карточка с картинкой кэшируется только после того, как
+    готовы миниатюры, иначе в кэше осталась бы исходная картинка.
+    """
+
+    key = card_key(post, **options)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(CARD_TEMPLATE, {'post': post, **options})
+        if not post.image or get_ready_srcset(post.image) is not None:
+            cache.set(key, html, settings.POSTS_PAGE_CACHE_TIMEOUT)
+    return html
+
+
+def remember_changed_fields(instance, update_fields=None):
+    """Отметка, что сохранение instance меняет вид карточек постов."""
+
+    fields = [
+        field for field in CARD_FIELDS[type(instance)]
+        if update_fields is None or field in update_fields
+    ]
+    instance._card_changed = False
+    if instance.pk is None or not fields:
+        return
+    previous = type(instance)._default_manager.filter(
+        pk=instance.pk
+    ).values(*fields).first()
+    instance._card_changed = previous is not None and any(
+        previous[field] != getattr(instance, field) for field in fields
+    )
+
+
+def touch_posts(**lookup):
+    """Новое время изменения постов, чтобы их карточки перерисовались."""
+
+    if Post.objects.filter(**lookup).update(updated=timezone.now()):
+        invalidate_content()
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .models import Follow
+
+
+def following_key(user_id):
+    return f'following:{user_id}'
+
+
+def following_ids(user_id):
+    """Множество id авторов, на которых подписан пользователь.
+
+    Загружается одним запросом и хранится в кэше до изменения
+    подписок пользователя.
+    """
+
+    key = following_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(
+            Follow.objects.filter(
+                user_id=user_id
+            ).values_list('author_id', flat=True)
+        )
+        cache.set(key, ids, settings.POSTS_PAGE_CACHE_TIMEOUT)
+    return ids
+
+
+def is_following(user, author):
+    return user.is_authenticated and author.pk in following_ids(user.pk)
+
+
+def invalidate_following(user_id):
+    """Сброс кэша подписок сразу и ещё раз после фиксации транзакции.
+
+    До фиксации другой запрос мог снова закэшировать старое
+    состояние.
+    """
+
+    key = following_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def follow(user, author):
+    """Подписка одним INSERT; повторная подписка ничего не меняет.
+
+    Возвращает True, если подписка создана.
+    """
+
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user=user, author=author)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow(user, author):
+    """Отписка; если подписки не было, ничего не происходит."""
+
+    deleted, _ = Follow.objects.filter(user=user, author=author).delete()
+    return deleted > 0
@@ -1,5 +1,12 @@
+from functools import partial
+
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+
+from .images import process_image
 from .models import Post, Comment
+from .thumbnails import schedule_thumbnail
 
 
 class PostForm(forms.ModelForm):
@@ -16,6 +23,25 @@ class PostForm(forms.ModelForm):
             )
         return data
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            try:
+                return process_image(image)
+            except OSError:
+                raise forms.ValidationError(
+                    'Не удалось обработать изображение.'
+                )
+        return image
+
+    def save(self, commit=True):
+        post = super().save(commit)
+        if commit and post.image and 'image' in self.changed_data:
+            transaction.on_commit(
+                partial(schedule_thumbnail, post.image.name)
+            )
+        return post
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
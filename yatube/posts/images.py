@@ -0,0 +1,64 @@
+"""Обработка картинок постов при загрузке.
+
+Оригинал уменьшается до POSTS_IMAGE_MAX_SIZE по большей стороне,
+поворачивается по EXIF Orientation и пересохраняется без
+метаданных в POSTS_IMAGE_FORMAT (WebP или прогрессивный JPEG).
+Результат пишется во временный файл на диске, а не в память,
+и storage копирует его на место по частям.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from PIL import Image, ImageOps
+
+EXTENSIONS = {
+    'WEBP': '.webp',
+    'JPEG': '.jpg',
+}
+
+
+def save_options(image_format):
+    quality = settings.POSTS_IMAGE_QUALITY
+    if image_format == 'WEBP':
+        return {'quality': quality, 'method': 4}
+    return {'quality': quality, 'optimize': True, 'progressive': True}
+
+
+def convert_mode(image, image_format):
+    """Режим, поддерживаемый форматом; прозрачность WebP сохраняется."""
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    if has_alpha and image_format == 'WEBP':
+        return image.convert('RGBA')
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+
+def process_image(uploaded):
+    """Уменьшенная и пересохранённая копия загруженной картинки.
+
+    Для JPEG декодирование сразу идёт в уменьшенном масштабе
+    (Image.draft), поэтому в памяти не оказывается полноразмерный
+    растр снимка с телефона. У анимированных картинок остаётся
+    первый кадр.
+    """
+
+    image_format = settings.POSTS_IMAGE_FORMAT
+    extension = EXTENSIONS[image_format]
+    max_size = settings.POSTS_IMAGE_MAX_SIZE
+    uploaded.seek(0)
+    with Image.open(uploaded) as image:
+        image.draft('RGB', (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        image = convert_mode(image, image_format)
+        stem = os.path.splitext(os.path.basename(uploaded.name))[0]
+        output = tempfile.TemporaryFile()
+        image.save(output, image_format, **save_options(image_format))
+    output.seek(0)
+    return File(output, name=f'{stem}{extension}')
@@ -0,0 +1,44 @@
+"""Key-value store sorl с наборами миниатюр для srcset.
+
+Модуль указывается в THUMBNAIL_KVSTORE и загружается sorl лениво:
+он импортирует модель sorl, поэтому его нельзя импортировать
+из posts.thumbnails, который загружается в воркере пула
+до django.setup().
+"""
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore
+
+SRCSET_IDENTITY = 'srcset'
+
+
+class SrcsetKVStore(KVStore):
+    """Хранилище sorl, в котором рядом с миниатюрами картинки лежит
+    их набор для srcset.
+
+    Запись хранится в базе, как и остальные записи sorl, а читается
+    через кэш перед ней; delete и cleanup удаляют её вместе
+    с миниатюрами.
+    """
+
+    def get_srcset(self, image_file):
+        return self._get(image_file.key, identity=SRCSET_IDENTITY)
+
+    def set_srcset(self, image_file, srcset):
+        self._set(image_file.key, srcset, identity=SRCSET_IDENTITY)
+
+    def delete_thumbnails(self, image_file):
+        self._delete(image_file.key, identity=SRCSET_IDENTITY)
+        super().delete_thumbnails(image_file)
+
+    def cleanup(self):
+        """Очистка sorl и удаление наборов, ссылающихся
+        на удалённые миниатюры."""
+
+        super().cleanup()
+        for key in self._find_keys(identity=SRCSET_IDENTITY):
+            srcset = self._get(key, identity=SRCSET_IDENTITY) or {}
+            if not all(
+                self._get(ImageFile(name).key)
+                for name, _ in srcset.get('thumbnails', [])
+            ):
+                self._delete(key, identity=SRCSET_IDENTITY)
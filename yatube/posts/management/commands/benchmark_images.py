@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import time
+from statistics import median
+
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.parsers import parse_geometry
+
+from posts.images import process_image
+from posts.thumbnails import (
+    THUMBNAIL_GEOMETRY, THUMBNAIL_OPTIONS, backend
+)
+
+
+def make_photo(path, size):
+    """Снимок "с телефона": шум поверх градиента, JPEG 95 с EXIF."""
+
+    noise = Image.effect_noise(size, 40).convert('RGB')
+    gradient = Image.linear_gradient('L').resize(size).convert('RGB')
+    photo = Image.blend(noise, gradient, 0.6)
+    exif = Image.Exif()
+    exif[0x010F] = 'Benchmark camera'
+    exif[0x0112] = 1
+    photo.save(path, 'JPEG', quality=95, exif=exif.tobytes())
+
+
+def thumbnail_time(storage, name):
+    """Время создания миниатюры sorl, как в воркере пула."""
+
+    options = dict(backend.default_options, **THUMBNAIL_OPTIONS)
+    start = time.perf_counter()
+    source = default.engine.get_image(ImageFile(name, storage))
+    ratio = default.engine.get_image_ratio(source, options)
+    geometry = parse_geometry(THUMBNAIL_GEOMETRY, ratio)
+    image = default.engine.create(source, geometry, options)
+    default.engine.write(
+        image, options, ImageFile(f'thumb-{name}.jpg', storage)
+    )
+    return time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает исходные снимки и картинки после posts.images: '
+            'размер на диске и время создания миниатюры.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=5)
+        parser.add_argument('--width', type=int, default=4032)
+        parser.add_argument('--height', type=int, default=3024)
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        storage = FileSystemStorage(location=directory)
+        rows = {'original': [], 'processed': []}
+        try:
+            for number in range(options['count']):
+                name = f'photo-{number}.jpg'
+                path = os.path.join(directory, name)
+                make_photo(path, (options['width'], options['height']))
+                start = time.perf_counter()
+                with open(path, 'rb') as photo:
+                    processed = process_image(photo)
+                    processed_name = storage.save(processed.name, processed)
+                ingest_time = time.perf_counter() - start
+                for kind, stored in (
+                    ('original', name), ('processed', processed_name)
+                ):
+                    rows[kind].append((
+                        storage.size(stored),
+                        thumbnail_time(storage, stored),
+                        ingest_time if kind == 'processed' else 0,
+                    ))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.stdout.write(
+            f'{"":<10} {"размер, КБ":>11} {"миниатюра, мс":>14} '
+            f'{"обработка, мс":>14}'
+        )
+        for kind, values in rows.items():
+            sizes, thumbnails, ingests = zip(*values)
+            self.stdout.write(
+                f'{kind:<10} {median(sizes) / 1024:>11.0f} '
+                f'{median(thumbnails) * 1000:>14.1f} '
+                f'{median(ingests) * 1000:>14.1f}'
+            )
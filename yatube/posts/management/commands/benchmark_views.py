@@ -0,0 +1,191 @@
+import json
+import re
+import time
+from contextlib import ExitStack
+from statistics import median
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from posts import urls
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+# Замеряются только маршруты, GET которых ничего не меняет: запросы
+# к follow/unfollow, созданию и правке постов и комментариям
+# изменили бы данные между повторами
+READ_ONLY_URLS = (
+    'posts_index',
+    'group_list',
+    'profile',
+    'search',
+    'post_detail',
+    'comments',
+    'follow_index',
+)
+# Анонимный проход пропускает страницы, требующие входа
+LOGIN_REQUIRED_URLS = ('follow_index',)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку и число SQL-запросов URL posts: '
+            'и сравнивает их с сохранённым базовым замером.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Очищать кэш перед каждым запросом.'
+        )
+        parser.add_argument(
+            '--user',
+            help='Пользователь для страниц, требующих входа '
+                 '(по умолчанию - самый активный подписчик).'
+        )
+        parser.add_argument(
+            '--query',
+            help='Запрос для страницы поиска '
+                 '(по умолчанию - первое слово последнего поста).'
+        )
+        parser.add_argument('--save', help='Сохранить замер в JSON-файл.')
+        parser.add_argument(
+            '--compare',
+            help='JSON-файл базового замера для сравнения.'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=20,
+            help='Допустимое ухудшение p50 в процентах.'
+        )
+
+    def sample_kwargs(self, query=None):
+        group = Group.objects.annotate(
+            posts_number=Count('posts')
+        ).order_by('-posts_number').first()
+        post = Post.objects.order_by('-pub_date').first()
+        if group is None or post is None:
+            raise CommandError('Нет данных: запустите generate_data.')
+        return {
+            'slug': group.slug,
+            'username': post.author.username,
+            'post_id': post.pk,
+            'q': query or re.findall(r'\w+', post.text)[0],
+        }
+
+    def benchmark_user(self, username):
+        if username:
+            return User.objects.get(username=username)
+        follower = Follow.objects.values('user').annotate(
+            follows=Count('pk')
+        ).order_by('-follows').first()
+        if follower is None:
+            return User.objects.first()
+        return User.objects.get(pk=follower['user'])
+
+    def urls(self, kwargs, anonymous=False):
+        for pattern in urls.urlpatterns:
+            if pattern.name not in READ_ONLY_URLS:
+                continue
+            if anonymous and pattern.name in LOGIN_REQUIRED_URLS:
+                continue
+            params = {
+                name: kwargs[name] for name in pattern.pattern.converters
+            }
+            url = reverse(f'{urls.app_name}:{pattern.name}', kwargs=params)
+            if pattern.name == 'search':
+                url += '?' + urlencode({'q': kwargs['q']})
+            yield pattern.name, url
+
+    def measure(self, client, url, repeat, cold):
+        timings, queries, statuses = [], [], set()
+        for _ in range(repeat):
+            if cold:
+                cache.clear()
+            with ExitStack() as stack:
+                captured = [
+                    stack.enter_context(CaptureQueriesContext(connection))
+                    for connection in connections.all()
+                ]
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(sum(len(context) for context in captured))
+            statuses.add(response.status_code)
+        return {
+            'url': url,
+            'p50_ms': round(median(timings), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'queries': max(queries),
+            'statuses': sorted(statuses),
+        }
+
+    def compare(self, results, baseline, threshold):
+        regressions = []
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            change = (result['p50_ms'] / before['p50_ms'] - 1) * 100
+            self.stdout.write(
+                f'{name:<24} p50 {before["p50_ms"]:>8} -> '
+                f'{result["p50_ms"]:>8} ms ({change:+.0f}%), '
+                f'queries {before["queries"]} -> {result["queries"]}'
+            )
+            if change > threshold or result['queries'] > before['queries']:
+                regressions.append(name)
+        return regressions
+
+    def handle(self, *args, **options):
+        user = self.benchmark_user(options['user'])
+        client = Client()
+        client.force_login(user)
+        kwargs = self.sample_kwargs(options['query'])
+        results = {}
+        self.stdout.write(
+            f'{"url name":<24} {"p50 ms":>8} {"p95 ms":>8} '
+            f'{"queries":>8} status'
+        )
+        # Анонимные страницы кэшируются иначе, чем страницы
+        # вошедшего пользователя, поэтому замеряются отдельно
+        passes = (('', client, False), ('anonymous:', Client(), True))
+        for prefix, pass_client, anonymous in passes:
+            for name, url in self.urls(kwargs, anonymous):
+                result = self.measure(
+                    pass_client, url, options['repeat'], options['cold']
+                )
+                name = prefix + name
+                results[name] = result
+                self.stdout.write(
+                    f'{name:<24} {result["p50_ms"]:>8} '
+                    f'{result["p95_ms"]:>8} {result["queries"]:>8} '
+                    f'{result["statuses"]}'
+                )
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump(results, file, indent=2, ensure_ascii=False)
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+            regressions = self.compare(
+                results, baseline, options['threshold']
+            )
+            if regressions:
+                raise CommandError(
+                    'Ухудшение относительно базового замера: '
+                    + ', '.join(regressions)
+                )
@@ -0,0 +1,248 @@
+import random
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+from PIL import Image
+
+from posts.caching import bump_generation
+from posts.models import (AuthorStats, Comment, Follow, Group, Post,
+                          PostStats, TimelineEntry)
+from posts.timeline import get_timeline_length
+
+User = get_user_model()
+
+# Уникальных картинок немного: посты с картинками ссылаются на них
+# по очереди, как если бы одни и те же файлы загружали повторно.
+IMAGE_POOL_SIZE = 10
+TIME_SPAN = timezone.timedelta(days=365)
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Временное отключение auto_now_add, чтобы задать даты вручную."""
+
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Создаёт синтетических пользователей, группы, посты, '
+            'комментарии и подписки для нагрузочного тестирования.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=5000)
+        parser.add_argument(
+            '--images',
+            type=float,
+            default=0,
+            help='Доля постов с картинками (0..1).'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='synthetic')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def log(self, message):
+        self.stdout.write(message)
+
+    def random_date(self):
+        return self.now - TIME_SPAN * self.random.random()
+
+    def create(self, model, objects):
+        created = 0
+        for batch in batched(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            created += len(batch)
+        self.log(f'{model._meta.verbose_name_plural}: {created}')
+
+    def id_range(self, queryset):
+        bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+        return bounds['low'], bounds['high']
+
+    def create_users(self, count, prefix):
+        password = make_password(None)
+        start = User.objects.filter(username__startswith=prefix).count()
+        self.create(User, (
+            User(
+                username=f'{prefix}_user_{start + i}',
+                first_name='Имя',
+                last_name=f'Фамилия {start + i}',
+                password=password,
+            ) for i in range(count)
+        ))
+        return self.id_range(User.objects.filter(username__startswith=prefix))
+
+    def create_groups(self, count, prefix):
+        start = Group.objects.filter(slug__startswith=prefix).count()
+        self.create(Group, (
+            Group(
+                title=f'Группа {start + i}',
+                slug=f'{prefix}-group-{start + i}',
+                description='Синтетическая группа',
+            ) for i in range(count)
+        ))
+        return list(
+            Group.objects.filter(
+                slug__startswith=prefix
+            ).values_list('pk', flat=True)
+        )
+
+    def create_images(self, prefix):
+        names = []
+        for i in range(IMAGE_POOL_SIZE):
+            buffer = BytesIO()
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            Image.new('RGB', (1920, 1080), color).save(buffer, 'JPEG')
+            names.append(default_storage.save(
+                f'posts/{prefix}_{i}.jpg', ContentFile(buffer.getvalue())
+            ))
+        return names
+
+    def posts(self, count, users, groups, images, image_share):
+        for i in range(count):
+            yield Post(
+                text=f'Синтетический пост номер {i}. ' * 5,
+                author_id=self.random.randint(*users),
+                group_id=self.random.choice(groups + [None]),
+                image=(
+                    images[i % len(images)]
+                    if images and self.random.random() < image_share
+                    else ''
+                ),
+                pub_date=self.random_date(),
+            )
+
+    def comments(self, count, users, posts):
+        for i in range(count):
+            yield Comment(
+                text=f'Синтетический комментарий {i}',
+                author_id=self.random.randint(*users),
+                post_id=self.random.randint(*posts),
+                created=self.random_date(),
+            )
+
+    def follows(self, count, users):
+        low, high = users
+        seen = set()
+        attempts = 0
+        while len(seen) < count and attempts < count * 10:
+            attempts += 1
+            pair = (self.random.randint(low, high),
+                    self.random.randint(low, high))
+            if pair[0] == pair[1] or pair in seen:
+                continue
+            seen.add(pair)
+            yield Follow(user_id=pair[0], author_id=pair[1])
+
+    def timeline_entries(self):
+        length = get_timeline_length()
+        followers = Follow.objects.values_list(
+            'user_id', flat=True
+        ).distinct().order_by()
+        for user_id in followers.iterator():
+            posts = Post.objects.filter(
+                author__following__user_id=user_id
+            ).values_list('pk', 'author_id', 'pub_date')[:length]
+            for post_id, author_id, pub_date in posts:
+                yield TimelineEntry(
+                    user_id=user_id,
+                    post_id=post_id,
+                    author_id=author_id,
+                    pub_date=pub_date,
+                )
+
+    def rebuild_timelines(self):
+        TimelineEntry.objects.all().delete()
+        self.create(TimelineEntry, self.timeline_entries())
+
+    def counts(self, queryset, field):
+        return dict(
+            queryset.values_list(field).annotate(
+                number=Count('pk')
+            ).order_by()
+        )
+
+    def author_stats(self):
+        posts = self.counts(Post.objects, 'author')
+        followers = self.counts(Follow.objects, 'author')
+        following = self.counts(Follow.objects, 'user')
+        for author_id in User.objects.values_list('pk', flat=True).iterator():
+            yield AuthorStats(
+                author_id=author_id,
+                posts_count=posts.get(author_id, 0),
+                followers_count=followers.get(author_id, 0),
+                following_count=following.get(author_id, 0),
+            )
+
+    def post_stats(self):
+        comments = self.counts(Comment.objects, 'post')
+        for post_id in Post.objects.values_list('pk', flat=True).iterator():
+            yield PostStats(
+                post_id=post_id, comments_count=comments.get(post_id, 0)
+            )
+
+    def rebuild_stats(self):
+        AuthorStats.objects.all().delete()
+        PostStats.objects.all().delete()
+        self.create(AuthorStats, self.author_stats())
+        self.create(PostStats, self.post_stats())
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        prefix = options['prefix']
+        users = self.create_users(options['users'], prefix)
+        groups = self.create_groups(options['groups'], prefix)
+        images = self.create_images(prefix) if options['images'] else []
+        last_post = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+        with explicit_dates(
+            Post._meta.get_field('pub_date'),
+            Comment._meta.get_field('created'),
+        ):
+            self.create(Post, self.posts(
+                options['posts'], users, groups, images, options['images']
+            ))
+            posts = self.id_range(Post.objects.filter(pk__gt=last_post))
+            if options['comments'] and posts[0] is not None:
+                self.create(Comment, self.comments(
+                    options['comments'], users, posts
+                ))
+        existing = set(Follow.objects.values_list('user_id', 'author_id'))
+        self.create(Follow, (
+            follow for follow in self.follows(options['follows'], users)
+            if (follow.user_id, follow.author_id) not in existing
+        ))
+        # bulk_create не отправляет сигналов: производные данные
+        # пересобираются целиком.
+        self.rebuild_timelines()
+        self.rebuild_stats()
+        bump_generation()
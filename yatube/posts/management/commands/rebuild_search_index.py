@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.search import is_supported, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов (SQLite FTS5).'
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            raise CommandError('Полнотекстовый индекс доступен только '
+                               'для SQLite.')
+        rebuild_index()
+        self.stdout.write('Поисковый индекс перестроен.')
@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Follow, TimelineEntry
+from posts.timeline import rebuild_timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames',
+            nargs='*',
+            help='Пользователи, чьи ленты нужно пересобрать (по умолчанию '
+                 'все подписчики).'
+        )
+
+    def handle(self, *args, **options):
+        usernames = options['usernames']
+        if usernames:
+            user_ids = list(
+                User.objects.filter(
+                    username__in=usernames
+                ).values_list('pk', flat=True)
+            )
+            if len(user_ids) != len(set(usernames)):
+                raise CommandError('Часть пользователей не найдена.')
+        else:
+            TimelineEntry.objects.exclude(
+                user_id__in=Follow.objects.values('user_id')
+            ).delete()
+            user_ids = Follow.objects.values_list(
+                'user_id', flat=True
+            ).distinct()
+        rebuilt = 0
+        for user_id in user_ids:
+            rebuild_timeline(user_id)
+            rebuilt += 1
+        self.stdout.write(f'Пересобрано лент: {rebuilt}')
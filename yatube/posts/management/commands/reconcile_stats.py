@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import reconcile_author_stats, reconcile_post_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики авторов и постов и исправляет расхождения.'
+
+    def handle(self, *args, **options):
+        authors = reconcile_author_stats()
+        posts = reconcile_post_stats()
+        self.stdout.write(
+            f'Исправлено счётчиков авторов: {authors}, постов: {posts}'
+        )
@@ -0,0 +1,56 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import (create_executor, generate_thumbnail,
+                              get_ready_srcset)
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры картинок постов в пуле процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Число процессов (0 - без пула, в текущем процессе).'
+        )
+
+    def missing_thumbnails(self):
+        images = Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).values_list('image', flat=True).order_by().distinct()
+        for name in images.iterator():
+            if get_ready_srcset(name) is None:
+                yield name
+
+    def handle(self, *args, **options):
+        names = list(self.missing_thumbnails())
+        workers = options['workers']
+        created = failed = 0
+        if not workers:
+            for name in names:
+                try:
+                    generate_thumbnail(name)
+                    created += 1
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+        else:
+            with create_executor(workers) as executor:
+                futures = [
+                    executor.submit(generate_thumbnail, name)
+                    for name in names
+                ]
+                for name, future in zip(names, futures):
+                    error = future.exception()
+                    if error is None:
+                        created += 1
+                    else:
+                        failed += 1
+                        self.stderr.write(f'{name}: {error}')
+        self.stdout.write(
+            f'Создано миниатюр: {created}, ошибок: {failed}'
+        )
@@ -0,0 +1,64 @@
+# Generated by Django 2.2.19 on 2026-10-18 19:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    PostStats = apps.get_model('posts', 'PostStats')
+    authors = User.objects.annotate(
+        posts_number=models.Count('posts', distinct=True),
+        followers_number=models.Count('following', distinct=True),
+        following_number=models.Count('follower', distinct=True),
+    )
+    AuthorStats.objects.bulk_create(
+        (
+            AuthorStats(
+                author_id=author.pk,
+                posts_count=author.posts_number,
+                followers_count=author.followers_number,
+                following_count=author.following_number,
+            ) for author in authors.iterator()
+        ),
+        batch_size=500
+    )
+    posts = Post.objects.annotate(comments_number=models.Count('comments'))
+    PostStats.objects.bulk_create(
+        (
+            PostStats(post_id=post.pk, comments_count=post.comments_number)
+            for post in posts.iterator()
+        ),
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0003_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostStats',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='Комментариев')),
+            ],
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
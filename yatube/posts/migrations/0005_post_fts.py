@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def install_index(apps, schema_editor):
+    from posts.search import install_index
+    install_index(schema_editor.connection)
+
+
+def drop_index(apps, schema_editor):
+    from posts.search import drop_index
+    drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_index, drop_index),
+    ]
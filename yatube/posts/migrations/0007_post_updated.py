@@ -0,0 +1,37 @@
+# Generated by Django 2.2.19 on 2026-10-18 19:40
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def fill_updated(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.using(schema_editor.connection.alias).update(
+        updated=F('pub_date')
+    )
+
+
+def install_index(apps, schema_editor):
+    # SQLite пересоздаёт posts_post при добавлении поля, и триггеры
+    # полнотекстового индекса нужно создать заново
+    from posts.search import install_index
+    install_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_updated, migrations.RunPython.noop),
+        migrations.RunPython(install_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.19 on 2026-10-18 20:19
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_timeline_post_order'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='authorstats',
+            options={'verbose_name': 'Статистика автора', 'verbose_name_plural': 'Статистика авторов'},
+        ),
+        migrations.AlterModelOptions(
+            name='poststats',
+            options={'verbose_name': 'Статистика поста', 'verbose_name_plural': 'Статистика постов'},
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.19 on 2026-10-18 20:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_stats_verbose_names'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='timelineentry',
+            options={'ordering': ('-pub_date',), 'verbose_name': 'Запись ленты', 'verbose_name_plural': 'Записи лент'},
+        ),
+    ]
@@ -0,0 +1,115 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from .models import Group, Post
+
+User = get_user_model()
+
+# Поля, по которым объекты моделей читаются через кэш
+CACHED_LOOKUPS = {
+    Post: ('pk',),
+    Group: ('pk', 'slug'),
+    User: ('pk', 'username'),
+}
+
+# Поля, которые попадают в кэш; остальные (у пользователя - хеш
+# пароля, email, права) не покидают базу
+CACHED_FIELDS = {
+    User: ('username', 'first_name', 'last_name'),
+}
+
+# Отметка в кэше для объекта, которого нет в базе
+MISSING = 'posts:missing'
+
+
+def object_key(model, field, value):
+    value = md5(str(value).encode()).hexdigest()
+    return f'object:{model._meta.label_lower}:{field}:{value}'
+
+
+def get_cached_object(model, **lookup):
+    """Объект model по одному полю из CACHED_LOOKUPS или None.
+
+    Найденный объект хранится в кэше до его изменения или
+    удаления, отсутствие объекта - POSTS_MISSING_CACHE_TIMEOUT
+    секунд, поэтому запросы несуществующих адресов тоже не доходят
+    до базы. Связанные объекты, счётчики и поля вне CACHED_FIELDS
+    в кэш не попадают.
+    """
+
+    (field, value), = lookup.items()
+    if field not in CACHED_LOOKUPS[model]:
+        raise ValueError(f'{model.__name__} is not cached by {field}')
+    key = object_key(model, field, value)
+    obj = cache.get(key)
+    if obj == MISSING:
+        return None
+    if obj is None:
+        queryset = model._default_manager.all()
+        if model in CACHED_FIELDS:
+            queryset = queryset.only(*CACHED_FIELDS[model])
+        try:
+            obj = queryset.get(**lookup)
+        except (model.DoesNotExist, ValueError):
+            cache.set(key, MISSING, settings.POSTS_MISSING_CACHE_TIMEOUT)
+            return None
+        cache.set(key, obj, settings.POSTS_OBJECT_CACHE_TIMEOUT)
+    return obj
+
+
+def get_cached_object_or_404(model, **lookup):
+    obj = get_cached_object(model, **lookup)
+    if obj is None:
+        raise Http404(f'No {model._meta.object_name} matches the query.')
+    return obj
+
+
+def lookup_keys(model, values):
+    return [
+        object_key(model, field, values[field])
+        for field in CACHED_LOOKUPS[model] if values.get(field) is not None
+    ]
+
+
+def invalidate_object(instance, values=None):
+    """Сброс кэша объекта по всем полям сразу и после фиксации.
+
+    values - прежние значения полей, если объект их меняет
+    (например, slug группы); иначе берутся текущие.
+    """
+
+    model = type(instance)
+    if values is None:
+        values = {
+            field: getattr(instance, field)
+            for field in CACHED_LOOKUPS[model]
+        }
+    keys = lookup_keys(model, values)
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_previous_values(instance, update_fields=None):
+    """Сброс кэша по значениям полей до сохранения instance.
+
+    Нужен, если меняется поле поиска: иначе по старому slug или
+    username из кэша продолжал бы отдаваться объект.
+    """
+
+    model = type(instance)
+    fields = [
+        field for field in CACHED_LOOKUPS[model]
+        if field != 'pk' and (update_fields is None or field in update_fields)
+    ]
+    if instance.pk is None or not fields:
+        return
+    values = model._default_manager.filter(
+        pk=instance.pk
+    ).values(*fields).first()
+    if values is not None:
+        invalidate_object(instance, values)
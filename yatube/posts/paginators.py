@@ -0,0 +1,226 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from core.cache.stampede import get_or_refresh
+
+from .caching import get_generation
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(direction, value, pk):
+    """Упаковка позиции в ленте в непрозрачную строку."""
+
+    raw = f'{direction}|{value.isoformat()}|{pk}'.encode()
+    return urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Распаковка курсора, созданного encode_cursor."""
+
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        raw = urlsafe_b64decode(cursor + padding).decode()
+        direction, value, pk = raw.split('|')
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (BinasciiError, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or value is None:
+        raise InvalidCursor(cursor)
+    return direction, value, pk
+
+
+class CursorPage:
+    """Страница ленты, полученная по курсору.
+
+    Повторяет ту часть интерфейса django.core.paginator.Page,
+    которая используется в шаблонах и тестах.
+    """
+
+    cursor_pagination = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        # у пустой страницы (курсор за концом ленты или на удалённый
+        # пост) нет объекта, от которого можно построить курсор
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _cursor(self, direction, obj):
+        return encode_cursor(
+            direction,
+            getattr(obj, self.paginator.field),
+            obj.pk
+        )
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self._cursor(CURSOR_NEXT, self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return self._cursor(CURSOR_PREVIOUS, self.object_list[0])
+
+
+class CursorPaginator:
+    """Паджинатор по ключу (field, pk) в порядке убывания.
+
+    В отличие от Paginator не выполняет COUNT(*) и OFFSET:
+    каждая страница - это диапазон по индексу, начинающийся
+    после последнего показанного объекта.
+    """
+
+    def __init__(self, object_list, per_page, field='pub_date'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.field = field
+
+    def _ordered(self, descending=True):
+        sign = '-' if descending else ''
+        return self.object_list.order_by(f'{sign}{self.field}', f'{sign}pk')
+
+    def _after(self, value, pk):
+        return Q(**{f'{self.field}__lt': value}) | Q(
+            **{self.field: value, 'pk__lt': pk}
+        )
+
+    def _before(self, value, pk):
+        return Q(**{f'{self.field}__gt': value}) | Q(
+            **{self.field: value, 'pk__gt': pk}
+        )
+
+    def page(self, cursor=None):
+        """Страница, следующая за курсором (или первая без курсора)."""
+
+        if not cursor:
+            rows = list(self._ordered()[:self.per_page + 1])
+            return CursorPage(
+                rows[:self.per_page], self, len(rows) > self.per_page, False
+            )
+        direction, value, pk = decode_cursor(cursor)
+        if direction == CURSOR_NEXT:
+            rows = list(
+                self._ordered().filter(
+                    self._after(value, pk)
+                )[:self.per_page + 1]
+            )
+            return CursorPage(
+                rows[:self.per_page], self, len(rows) > self.per_page, True
+            )
+        rows = list(
+            self._ordered(descending=False).filter(
+                self._before(value, pk)
+            )[:self.per_page + 1]
+        )
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return CursorPage(rows, self, True, has_previous)
+
+    def get_page(self, cursor=None):
+        """Как page(), но некорректный курсор ведёт на первую страницу."""
+
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+
+class CachedCountPage(Page):
+
+    @property
+    def elided_page_range(self):
+        return self.paginator.get_elided_page_range(self.number)
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который считает COUNT(*) один раз на поколение.
+
+    Число объектов хранится в кэше под ключом count_key с версией -
+    поколением контента (posts.caching), поэтому все страницы
+    ленты и все пользователи используют один подсчёт до следующей
+    записи. Без count_key ведёт себя как обычный Paginator.
+    """
+
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        return get_or_refresh(
+            f'count:{self.count_key}',
+            lambda: super(CachedCountPaginator, self).count,
+            settings.POSTS_PAGE_CACHE_TIMEOUT,
+            version=get_generation()
+        )
+
+    def _get_page(self, *args, **kwargs):
+        return CachedCountPage(*args, **kwargs)
+
+    def get_elided_page_range(self, number, on_each_side=2, on_ends=1):
+        """Номера страниц вокруг текущей и по краям, пропуски - ELLIPSIS.
+
+        Длина списка не зависит от числа страниц, поэтому
+        разметка паджинатора не растёт вместе с лентой.
+        """
+
+        number = self.validate_number(number)
+        num_pages = self.num_pages
+        if num_pages <= (on_each_side + on_ends) * 2 + 1:
+            yield from self.page_range
+            return
+        if number > on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < num_pages - on_each_side - on_ends:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(num_pages - on_ends + 1, num_pages + 1)
+        else:
+            yield from range(number + 1, num_pages + 1)
@@ -0,0 +1,125 @@
+import re
+
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+POST_TABLE = Post._meta.db_table
+
+CREATE_INDEX_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"text, content='{POST_TABLE}', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai "
+    f"AFTER INSERT ON {POST_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad "
+    f"AFTER DELETE ON {POST_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+    f"AFTER UPDATE OF text ON {POST_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+    f"END",
+)
+DROP_TRIGGERS_SQL = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+)
+REBUILD_INDEX_SQL = (
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+)
+
+
+class RawSubquery(RawSQL):
+    """Подзапрос для фильтра __in.
+
+    Lookup In сам заключает подзапрос в скобки; RawSQL добавил бы
+    вторые, и SQLite считал бы подзапрос скалярным, возвращающим
+    только первую строку.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def is_supported(db=connection):
+    return db.vendor == 'sqlite'
+
+
+def install_index(db=connection, rebuild=True):
+    """Создание индекса FTS5 и триггеров синхронизации с Post.
+
+    Триггеры создаются заново после каждого пересоздания таблицы
+    posts_post (например, миграцией, добавляющей поле).
+    """
+
+    if not is_supported(db):
+        return
+    with db.cursor() as cursor:
+        for statement in CREATE_INDEX_SQL:
+            cursor.execute(statement)
+        if rebuild:
+            cursor.execute(REBUILD_INDEX_SQL)
+
+
+def drop_index(db=connection):
+    if not is_supported(db):
+        return
+    with db.cursor() as cursor:
+        for statement in DROP_TRIGGERS_SQL:
+            cursor.execute(statement)
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def rebuild_index(db=connection):
+    """Пересоздание триггеров и перестроение индекса по таблице Post."""
+
+    with db.cursor() as cursor:
+        for statement in DROP_TRIGGERS_SQL:
+            cursor.execute(statement)
+    install_index(db)
+
+
+def build_match_query(text):
+    """Запрос FTS5 из пользовательского ввода: все слова, по префиксу.
+
+    Каждое слово заключается в кавычки, поэтому операторы FTS5 во
+    вводе не интерпретируются и не приводят к синтаксическим ошибкам.
+    """
+
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_posts(text, queryset=None):
+    """Посты, подходящие под запрос, в порядке релевантности."""
+
+    if queryset is None:
+        queryset = Post.objects.all()
+    match = build_match_query(text)
+    if not match:
+        return queryset.none()
+    if not is_supported():
+        return queryset.filter(text__icontains=text)
+    return queryset.filter(
+        id__in=RawSubquery(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match]
+        )
+    ).annotate(
+        search_rank=RawSQL(
+            f'SELECT rank FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {POST_TABLE}.id',
+            [match],
+            output_field=FloatField()
+        )
+    ).order_by('search_rank')
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import cards, follows, objects, timeline
+from .caching import invalidate_content
+from .models import AuthorStats, Comment, Follow, Group, Post, PostStats
+from .stats import change_counter
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out_post(instance)
+        change_counter(AuthorStats, instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    change_counter(AuthorStats, instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        change_counter(PostStats, instance.post_id, 'comments_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    change_counter(PostStats, instance.post_id, 'comments_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill_timeline(instance.user_id, instance.author_id)
+        change_counter(AuthorStats, instance.user_id, 'following_count', 1)
+        change_counter(AuthorStats, instance.author_id, 'followers_count', 1)
+        follows.invalidate_following(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.remove_from_timeline(instance.user_id, instance.author_id)
+    change_counter(AuthorStats, instance.user_id, 'following_count', -1)
+    change_counter(AuthorStats, instance.author_id, 'followers_count', -1)
+    follows.invalidate_following(instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def content_changed(sender, **kwargs):
+    invalidate_content()
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=User)
+def cached_object_saving(sender, instance, update_fields=None, **kwargs):
+    objects.invalidate_previous_values(instance, update_fields)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def cached_object_changed(sender, instance, **kwargs):
+    objects.invalidate_object(instance)
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=User)
+def card_fields_saving(sender, instance, update_fields=None, **kwargs):
+    cards.remember_changed_fields(instance, update_fields)
+
+
+@receiver(post_save, sender=Group)
+def group_card_saved(sender, instance, created, **kwargs):
+    if instance._card_changed:
+        cards.touch_posts(group=instance)
+
+
+@receiver(post_save, sender=User)
+def author_card_saved(sender, instance, created, **kwargs):
+    if instance._card_changed:
+        cards.touch_posts(author=instance)
+        # Имя выводится и вне карточек: в профиле и комментариях,
+        # поэтому поколение меняется, даже если постов у автора нет
+        invalidate_content()
+
+
+@receiver(pre_delete, sender=Group)
+def group_card_deleting(sender, instance, **kwargs):
+    # SET_NULL обновляет посты запросом без сигналов и без updated
+    cards.touch_posts(group=instance)
@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import AuthorStats, Post, PostStats
+
+User = get_user_model()
+
+
+def change_counter(model, pk, field, delta):
+    """Изменение счётчика field строки статистики pk на delta.
+
+    Строка создаётся при первом увеличении счётчика; уменьшение
+    отсутствующего или нулевого счётчика игнорируется, такое
+    расхождение исправляет команда reconcile_stats.
+    """
+
+    with transaction.atomic():
+        rows = model.objects.filter(pk=pk)
+        if delta < 0:
+            rows = rows.filter(**{f'{field}__gte': -delta})
+        if rows.update(**{field: F(field) + delta}) or delta < 0:
+            return
+        _, created = model.objects.get_or_create(
+            pk=pk, defaults={field: delta}
+        )
+        if not created:
+            rows.update(**{field: F(field) + delta})
+
+
+def author_stats(author):
+    """Статистика автора; для автора без записей - нулевая."""
+
+    try:
+        return author.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(author=author)
+
+
+def post_stats(post):
+    """Статистика поста; для поста без записей - нулевая."""
+
+    try:
+        return post.stats
+    except PostStats.DoesNotExist:
+        return PostStats(post=post)
+
+
+def reconcile_author_stats():
+    """Пересчёт счётчиков авторов. Возвращает число исправленных строк."""
+
+    fixed = 0
+    authors = User.objects.annotate(
+        posts_number=Count('posts', distinct=True),
+        followers_number=Count('following', distinct=True),
+        following_number=Count('follower', distinct=True),
+    ).select_related('stats')
+    for author in authors.iterator():
+        actual = {
+            'posts_count': author.posts_number,
+            'followers_count': author.followers_number,
+            'following_count': author.following_number,
+        }
+        try:
+            stats = author.stats
+        except AuthorStats.DoesNotExist:
+            stats = None
+        if stats is not None and all(
+            getattr(stats, name) == value for name, value in actual.items()
+        ):
+            continue
+        AuthorStats.objects.update_or_create(
+            author_id=author.pk, defaults=actual
+        )
+        fixed += 1
+    return fixed
+
+
+def reconcile_post_stats():
+    """Пересчёт счётчиков постов. Возвращает число исправленных строк."""
+
+    fixed = 0
+    posts = Post.objects.annotate(
+        comments_number=Count('comments')
+    ).select_related('stats').order_by()
+    for post in posts.iterator():
+        try:
+            stats = post.stats
+        except PostStats.DoesNotExist:
+            stats = None
+        if stats is not None and (
+            stats.comments_count == post.comments_number
+        ):
+            continue
+        PostStats.objects.update_or_create(
+            post_id=post.pk,
+            defaults={'comments_count': post.comments_number}
+        )
+        fixed += 1
+    return fixed
@@ -0,0 +1,14 @@
+from django import template
+
+from posts.cards import render_card
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card(post, author=True, author_link=True, group_link=True):
+    """Карточка поста в ленте, отрисованная один раз на версию поста."""
+
+    return render_card(
+        post, author=author, author_link=author_link, group_link=group_link
+    )
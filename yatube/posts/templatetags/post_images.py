@@ -0,0 +1,34 @@
+from functools import partial
+
+from django import template
+from django.conf import settings
+from django.db import transaction
+from django.utils.html import format_html
+
+from posts.thumbnails import get_ready_srcset, schedule_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_image(image):
+    """Тег <img> картинки поста с srcset из готовых миниатюр.
+
+    Пока миниатюры не созданы фоновым пулом, выводится исходная
+    картинка, а генерация ставится в очередь.
+    """
+
+    if not image:
+        return ''
+    srcset = get_ready_srcset(image)
+    if srcset is None:
+        transaction.on_commit(partial(schedule_thumbnail, image.name))
+        return format_html(
+            '<img class="card-img my-2" src="{}">', image.url
+        )
+    return format_html(
+        '<img class="card-img my-2" src="{}" srcset="{}" sizes="{}">',
+        srcset[-1][0],
+        ', '.join(f'{url} {width}w' for url, width in srcset),
+        settings.POSTS_THUMBNAIL_SIZES
+    )
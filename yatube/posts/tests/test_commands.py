@@ -0,0 +1,77 @@
+# posts/tests/test_commands.py
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import AuthorStats, Comment, Follow, Post, TimelineEntry
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SyntheticDataTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_generate_data_and_benchmark(self):
+        """generate_data создаёт данные и производные таблицы,
+        benchmark_views замеряет читающие URL posts: и сравнивает с базой"""
+        call_command(
+            'generate_data', users=5, groups=2, posts=30, comments=10,
+            follows=6, images=0.5, seed=1, stdout=StringIO()
+        )
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 10)
+        self.assertEqual(Follow.objects.count(), 6)
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('posts_count', flat=True)),
+            30
+        )
+        self.assertEqual(
+            len(set(Post.objects.values_list('pub_date', flat=True))), 30
+        )
+        baseline = os.path.join(TEMP_MEDIA_ROOT, 'baseline.json')
+        call_command(
+            'benchmark_views', repeat=1, save=baseline, stdout=StringIO()
+        )
+        with open(baseline) as file:
+            results = json.load(file)
+        self.assertIn('posts_index', results)
+        self.assertIn('follow_index', results)
+        self.assertNotIn('profile_follow', results)
+        self.assertNotIn('post_create', results)
+        self.assertEqual(Follow.objects.count(), 6)
+        self.assertEqual(results['posts_index']['statuses'], [200])
+        self.assertIn('?q=', results['search']['url'])
+        self.assertEqual(results['anonymous:search']['statuses'], [200])
+        self.assertNotIn('anonymous:follow_index', results)
+        output = StringIO()
+        call_command(
+            'benchmark_views', repeat=1, compare=baseline, threshold=10000,
+            stdout=output
+        )
+        self.assertIn('posts_index', output.getvalue())
+
+    def test_benchmark_images(self):
+        """benchmark_images сравнивает исходные и обработанные снимки"""
+        output = StringIO()
+        call_command(
+            'benchmark_images', count=1, width=400, height=300,
+            stdout=output
+        )
+        self.assertIn('original', output.getvalue())
+        self.assertIn('processed', output.getvalue())
@@ -1,7 +1,9 @@
 # posts/tests/tests_form.py
 import shutil
 import tempfile
+from io import BytesIO
 
+from PIL import Image
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
@@ -83,8 +85,9 @@ class PostFormTests(TestCase):
         # проверяем, что созданный пост по дате является последним
         max_post = max(Post.objects.all(), key=lambda p: p.pub_date)
         self.assertTrue(filtered_posts[0].pub_date == max_post.pub_date)
-        # проверяем, что созданный пост содержит картинку
-        self.assertTrue(filtered_posts[0].image == 'posts/small.gif')
+        # проверяем, что созданный пост содержит картинку,
+        # пересохранённую в POSTS_IMAGE_FORMAT
+        self.assertTrue(filtered_posts[0].image == 'posts/small.webp')
         # проверяем редирект
         self.assertRedirects(
             response,
@@ -120,3 +123,45 @@ class PostFormTests(TestCase):
         # проверка того, что тексты в прежнем и измененном посте не совпадают
         post = Post.objects.get(pk=PostFormTests.post.id)
         self.assertTrue(post.text == changed_text)
+
+    @override_settings(POSTS_IMAGE_MAX_SIZE=100, POSTS_IMAGE_FORMAT='JPEG')
+    def test_uploaded_image_is_downscaled_and_stripped(self):
+        """Картинка при загрузке уменьшается, поворачивается по EXIF
+        и сохраняется без метаданных"""
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернуть на 90° по часовой
+        exif[0x010F] = 'Test camera'
+        Image.new('RGB', (400, 200), 'red').save(
+            buffer, 'JPEG', exif=exif.tobytes()
+        )
+        uploaded = SimpleUploadedFile(
+            name='photo.jpeg',
+            content=buffer.getvalue(),
+            content_type='image/jpeg'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с большой фотографией с телефона',
+                'image': uploaded,
+            }
+        )
+        post = Post.objects.get(text='Пост с большой фотографией с телефона')
+        self.assertEqual(post.image.name, 'posts/photo.jpg')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (50, 100))
+            self.assertEqual(len(image.getexif()), 0)
+            self.assertTrue(image.info.get('progressive'))
+
+    def test_broken_image_is_rejected(self):
+        """Файл, который не является картинкой, не принимается"""
+        uploaded = SimpleUploadedFile(
+            name='broken.jpg', content=b'not an image',
+            content_type='image/jpeg'
+        )
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с повреждённой картинкой', 'image': uploaded}
+        )
+        self.assertTrue(response.context['form'].errors['image'])
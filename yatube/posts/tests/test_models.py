@@ -1,8 +1,13 @@
 # posts/tests/test_models.py
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
 
-from ..models import Group, Post, Comment, Follow
+from ..models import (
+    AuthorStats, Comment, Follow, Group, Post, PostStats, TimelineEntry
+)
+from ..paginators import CursorPaginator
+from ..timeline import timeline_posts
 
 User = get_user_model()
 
@@ -143,3 +148,85 @@ class FollowModelTest(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(
                     follow._meta.get_field(value).verbose_name, expected)
+
+
+class ServiceModelTest(TestCase):
+
+    def test_service_model_verbose_names(self):
+        """Проверяем, что verbose_name служебных моделей на русском"""
+        model_verboses = {
+            AuthorStats: ('Статистика автора', 'Статистика авторов'),
+            PostStats: ('Статистика поста', 'Статистика постов'),
+            TimelineEntry: ('Запись ленты', 'Записи лент'),
+        }
+        for model, expected in model_verboses.items():
+            with self.subTest(model=model.__name__):
+                self.assertEqual(
+                    (model._meta.verbose_name,
+                     model._meta.verbose_name_plural),
+                    expected
+                )
+
+class FeedQueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='Test-slug',
+            description='Test description',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый пост для проверки планов запросов.',
+            group=cls.group
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+
+    def test_feeds_use_indexes_without_sorting(self):
+        """Ленты читаются по составным индексам без сортировки в B-tree"""
+        cursor_feed = CursorPaginator(Post.objects.feed(), 10)
+        cursor_group = CursorPaginator(self.group.posts.feed(), 10)
+        feeds = {
+            'post_pub_date_idx': Post.objects.feed(),
+            'post_group_pub_date_idx': self.group.posts.feed(),
+            'post_author_pub_date_idx': Post.objects.feed().filter(
+                author__username=self.author.username
+            ),
+            'timeline_user_pub_date_idx': timeline_posts(self.user),
+            'comment_post_created_idx': self.post.comments.select_related(
+                'author'
+            ),
+            'follow_user_author_idx': Follow.objects.filter(
+                user=self.user
+            ).values_list('author_id'),
+        }
+        cursor_feeds = {
+            'post_pub_date_idx': cursor_feed._ordered(),
+            'post_group_pub_date_idx': cursor_group._ordered(),
+        }
+        for index, queryset in (
+            list(feeds.items()) + list(cursor_feeds.items())
+        ):
+            plan = self.query_plan(queryset[:10])
+            with self.subTest(index=index, plan=plan):
+                self.assertIn(f'USING INDEX {index}', plan.replace(
+                    'USING COVERING INDEX', 'USING INDEX'
+                ))
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_follow_lookup_uses_index(self):
+        """Проверка подписки не сканирует таблицу подписок"""
+        plan = self.query_plan(
+            Follow.objects.filter(user=self.user, author=self.author)
+        )
+        self.assertIn('INDEX', plan)
+        self.assertNotIn('SCAN', plan)
@@ -48,12 +48,16 @@ class PostURLTests(TestCase):
         /,
         /group/<slug:slug>/,
         /profile/<str:username>/,
-        posts/<int:post_id>/"""
+        posts/<int:post_id>/,
+        posts/<int:post_id>/comments/,
+        /search/"""
         url_names = [
             '/',
             f'/group/{PostURLTests.post.group.slug}/',
             f'/profile/{PostURLTests.post.author}/',
             f'/posts/{PostURLTests.post.id}/',
+            f'/posts/{PostURLTests.post.id}/comments/',
+            '/search/?q=test',
         ]
         for address in url_names:
             with self.subTest(address=address):
@@ -142,6 +146,8 @@ class PostURLTests(TestCase):
             f'/profile/{PostURLTests.post.author}/',
             path.join('posts', 'post_detail.html'):
             f'/posts/{PostURLTests.post.id}/',
+            path.join('posts', 'includes', 'comment_list.html'):
+            f'/posts/{PostURLTests.post.id}/comments/',
             path.join('posts', 'create_post.html'): '/create/',
         }
         for template, address in templates_url_names.items():
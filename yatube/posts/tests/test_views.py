@@ -1,17 +1,38 @@
 # posts/tests/test_views.py
+import re
 import shutil
 import tempfile
 
-from os import path
-from random import randint
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+from os import path, walk
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
 from django import forms
-from posts.models import Post, Group, Comment, Follow
+from sorl.thumbnail import default, delete
+from core.cache import stampede
+from posts.caching import bump_generation, page_cache_key
+from posts.models import (
+    AuthorStats, Comment, Follow, Group, Post, PostStats, TimelineEntry
+)
+from posts.objects import get_cached_object, object_key
+from posts.paginators import (
+    CURSOR_NEXT, CURSOR_PREVIOUS, CachedCountPaginator, encode_cursor
+)
+from posts.thumbnails import (create_executor, generate_thumbnail,
+                              get_ready_srcset, thumbnail_geometries)
+from posts.timeline import timeline_posts
+from posts.views import COMMENT_AMOUNT, POST_AMOUNT
 
 User = get_user_model()
 
@@ -350,6 +371,131 @@ class PaginatorViewsTest(TestCase):
         )
         self.assertEqual(len(response.context['page_obj']), 0)
 
+    def test_count_is_cached_until_next_write(self):
+        """COUNT(*) ленты выполняется один раз до следующей записи"""
+        self.client.get(reverse('posts:posts_index'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:posts_index') + '?page=2'
+            )
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.client.get(reverse('posts:posts_index') + '?page=2')
+        self.assertEqual(response.context['page_obj'].paginator.count, 14)
+
+    def test_elided_page_range(self):
+        """Паджинатор показывает края и соседей текущей страницы"""
+        paginator = CachedCountPaginator(range(200), 10)
+        ellipsis = paginator.ELLIPSIS
+        cases = (
+            (1, [1, 2, 3, ellipsis, 20]),
+            (10, [1, ellipsis, 8, 9, 10, 11, 12, ellipsis, 20]),
+            (20, [1, ellipsis, 18, 19, 20]),
+        )
+        for number, expected in cases:
+            with self.subTest(number=number):
+                self.assertEqual(
+                    list(paginator.page(number).elided_page_range), expected
+                )
+        self.assertEqual(
+            list(CachedCountPaginator(range(50), 10).get_elided_page_range(1)),
+            [1, 2, 3, 4, 5]
+        )
+
+    def test_paginator_markup_does_not_grow_with_pages(self):
+        """Число ссылок паджинатора не зависит от числа страниц"""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {number}')
+            for number in range(POST_AMOUNT * 20)
+        )
+        response = self.client.get(reverse('posts:posts_index') + '?page=10')
+        self.assertLess(response.content.decode().count('page-item'), 15)
+
+
+@override_settings(POSTS_PAGINATION='cursor')
+class CursorPaginatorViewsTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='test_group',
+            slug='test-group',
+            description='Тестовое описание группы',
+        )
+        Post.objects.bulk_create(
+            Post(
+                author=cls.user,
+                text=f'Test post {i} for cursor pagination',
+                group=cls.group,
+            ) for i in range(1, 14)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_are_paginated_by_cursor(self):
+        """Ленты index, group_list и profile листаются по курсору"""
+        urls = (
+            reverse('posts:posts_index'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': CursorPaginatorViewsTest.group.slug}
+            ),
+            reverse(
+                'posts:profile',
+                kwargs={'username': CursorPaginatorViewsTest.user}
+            ),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first_page = self.client.get(url).context['page_obj']
+                self.assertEqual(len(first_page), 10)
+                self.assertFalse(first_page.has_previous())
+                second_page = self.client.get(
+                    url, {'cursor': first_page.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second_page), 3)
+                self.assertFalse(second_page.has_next())
+                shown = {post.pk for post in first_page}
+                self.assertFalse(shown & {post.pk for post in second_page})
+                back_page = self.client.get(
+                    url, {'cursor': second_page.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual([post.pk for post in back_page],
+                                 [post.pk for post in first_page])
+
+    def test_invalid_cursor_shows_first_page(self):
+        """Некорректный курсор приводит на первую страницу"""
+        response = self.client.get(
+            reverse('posts:posts_index'), {'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_out_of_range_cursor_gives_empty_page(self):
+        """Курсор за концом ленты даёт пустую страницу без ссылок"""
+        cursors = (
+            (CURSOR_NEXT, datetime(1970, 1, 2, tzinfo=timezone.utc)),
+            (CURSOR_PREVIOUS, datetime(2999, 1, 1, tzinfo=timezone.utc)),
+        )
+        for direction, value in cursors:
+            with self.subTest(direction=direction):
+                response = self.client.get(
+                    reverse('posts:posts_index'),
+                    {'cursor': encode_cursor(direction, value, 1)}
+                )
+                self.assertEqual(response.status_code, 200)
+                page = response.context['page_obj']
+                self.assertEqual(len(page), 0)
+                self.assertFalse(page.has_other_pages())
+                self.assertIsNone(page.next_cursor)
+                self.assertIsNone(page.previous_cursor)
+
 
 class CacheTests(TestCase):
 
@@ -379,19 +525,58 @@ class CacheTests(TestCase):
         cache.clear()
 
     def test_index_page_cache(self):
-        """Проверка кэширования главной страницы"""
-        response = self.guest_client.get(reverse('posts:posts_index'))
-        post = Post.objects.get(pk=randint(1, CacheTests.count_posts))
-        post.delete()
-        # проверяем наличие текста удаленного поста в контенте
+        """Главная страница берётся из кэша, пока контент не менялся"""
+        post = CacheTests.posts[0]
+        self.guest_client.get(reverse('posts:posts_index'))
+        # изменение в обход сигналов не сбрасывает кэш
+        Post.objects.filter(text=post.text).update(text='Changed silently')
         response = self.guest_client.get(reverse('posts:posts_index'))
         self.assertContains(response, post.text)
-        # чистим кэш и проверяем, что текст удаленного поста
-        # исчез из контента
         cache.clear()
         response = self.guest_client.get(reverse('posts:posts_index'))
         self.assertNotContains(response, post.text)
 
+    def test_feed_caches_are_invalidated_on_write(self):
+        """Удаление поста сразу видно на закэшированных страницах лент"""
+        post = Post.objects.filter(group=CacheTests.group).first()
+        urls = (
+            reverse('posts:posts_index'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': CacheTests.group.slug}
+            ),
+            reverse(
+                'posts:profile',
+                kwargs={'username': CacheTests.user.username}
+            ),
+        )
+        for url in urls:
+            self.assertContains(self.guest_client.get(url), post.text)
+        post.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNotContains(self.guest_client.get(url), post.text)
+
+    def test_generation_is_bumped_again_on_commit(self):
+        """Поколение меняется при записи и повторно после фиксации"""
+        with mock.patch('django.db.transaction.on_commit') as on_commit:
+            Post.objects.create(author=CacheTests.user, text='New post')
+        on_commit.assert_any_call(bump_generation)
+
+    def test_stale_page_is_served_while_rebuilding(self):
+        """Пока другой воркер пересобирает ленту, отдаётся прежняя"""
+        authorized_client = Client()
+        authorized_client.force_login(CacheTests.user)
+        url = reverse('posts:posts_index')
+        key = page_cache_key(
+            authorized_client.get(url).wsgi_request, 'index_page'
+        )
+        Post.objects.create(author=CacheTests.user, text='Brand new post')
+        lock = stampede.acquire(key)
+        self.assertNotContains(authorized_client.get(url), 'Brand new post')
+        stampede.release(key, lock)
+        self.assertContains(authorized_client.get(url), 'Brand new post')
+
 
 class FollowTests(TestCase):
 
@@ -478,3 +663,822 @@ class FollowTests(TestCase):
             )
         )
         self.assertEqual(response.status_code, 302)
+
+    def test_follow_and_unfollow_are_idempotent(self):
+        """Повторные подписка и отписка не меняют данные и счётчики"""
+        follow_url = reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.user_following.username}
+        )
+        unfollow_url = reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.user_following.username}
+        )
+        for _ in range(2):
+            self.auth_client_follower.get(follow_url)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            AuthorStats.objects.get(
+                author=self.user_following
+            ).followers_count,
+            1
+        )
+        for _ in range(2):
+            self.auth_client_follower.get(unfollow_url)
+        self.assertEqual(Follow.objects.count(), 0)
+        self.assertEqual(
+            AuthorStats.objects.get(
+                author=self.user_following
+            ).followers_count,
+            0
+        )
+
+    def test_profile_follow_flag_is_cached(self):
+        """Флаг подписки в профиле берётся из кэша подписок
+        и обновляется после подписки"""
+        cache.clear()
+        url = reverse(
+            'posts:profile',
+            kwargs={'username': self.user_following.username}
+        )
+        response = self.auth_client_follower.get(url)
+        self.assertFalse(response.context['following'])
+        self.auth_client_follower.get(
+            reverse(
+                'posts:profile_follow',
+                kwargs={'username': self.user_following.username}
+            )
+        )
+        response = self.auth_client_follower.get(url)
+        self.assertTrue(response.context['following'])
+        with CaptureQueriesContext(connection) as queries:
+            self.auth_client_follower.get(url, {'page': 1})
+        self.assertFalse(
+            any('posts_follow' in query['sql'] for query in queries)
+        )
+
+
+class TimelineTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.follower = User.objects.create_user(username='follower')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Post published before subscription',
+        )
+
+    def setUp(self):
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def follow_feed(self):
+        response = self.follower_client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_follow_backfills_and_post_fans_out(self):
+        """Подписка дополняет ленту старыми постами автора,
+        а новые посты автора попадают в ленту при публикации"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.assertEqual(self.follow_feed(), [self.old_post.text])
+        new_post = Post.objects.create(
+            author=self.author,
+            text='Post published after subscription',
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.follower, post=new_post
+            ).exists()
+        )
+        self.assertEqual(
+            self.follow_feed(), [new_post.text, self.old_post.text]
+        )
+
+    def test_unfollow_trims_timeline(self):
+        """Отписка удаляет посты автора из ленты"""
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        follow.delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.follower).exists()
+        )
+        self.assertEqual(self.follow_feed(), [])
+
+    @override_settings(POSTS_TIMELINE_LENGTH=2)
+    def test_timeline_length_is_capped(self):
+        """Лента не превышает POSTS_TIMELINE_LENGTH записей"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        for i in range(3):
+            Post.objects.create(author=self.author, text=f'Capped post {i}')
+        self.assertEqual(
+            self.follow_feed(), ['Capped post 2', 'Capped post 1']
+        )
+
+    def test_posts_with_same_date_keep_order(self):
+        """Посты с одинаковой датой идут в ленте по убыванию id"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Same date {i}')
+            for i in range(3)
+        ]
+        TimelineEntry.objects.filter(user=self.follower).update(
+            pub_date=self.old_post.pub_date
+        )
+        self.assertEqual(
+            [post.pk for post in timeline_posts(self.follower)],
+            sorted([post.pk for post in posts] + [self.old_post.pk],
+                   reverse=True)
+        )
+
+    @override_settings(POSTS_TIMELINE_LENGTH=1)
+    def test_fan_out_trims_timelines_in_one_query(self):
+        """Публикация обрезает ленты всех подписчиков одним запросом"""
+        followers = [self.follower] + [
+            User.objects.create_user(username=f'follower_{i}')
+            for i in range(3)
+        ]
+        for follower in followers:
+            Follow.objects.create(user=follower, author=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            new_post = Post.objects.create(
+                author=self.author, text='Post for every follower'
+            )
+        deletes = [
+            query for query in queries
+            if query['sql'].startswith('DELETE')
+        ]
+        self.assertEqual(len(deletes), 1)
+        for follower in followers:
+            self.assertEqual(
+                list(TimelineEntry.objects.filter(
+                    user=follower
+                ).values_list('post', flat=True)),
+                [new_post.pk]
+            )
+
+    def test_rebuild_timelines_command(self):
+        """Команда rebuild_timelines восстанавливает ленты по подпискам"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.follow_feed(), [self.old_post.text])
+
+
+class StatsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Post to test denormalized counters',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_counters_follow_writes(self):
+        """Счётчики обновляются при создании и удалении записей"""
+        Post.objects.create(author=self.author, text='Second post to count')
+        comment = Comment.objects.create(
+            author=self.reader, post=self.post, text='Comment to count'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        author_stats = AuthorStats.objects.get(author=self.author)
+        self.assertEqual(author_stats.posts_count, 2)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.reader).following_count, 1
+        )
+        self.assertEqual(
+            PostStats.objects.get(post=self.post).comments_count, 1
+        )
+        comment.delete()
+        follow.delete()
+        self.assertEqual(
+            PostStats.objects.get(post=self.post).comments_count, 0
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).followers_count, 0
+        )
+
+    def test_pages_show_counters_without_counting_rows(self):
+        """profile и post_detail берут счётчики из таблицы статистики"""
+        AuthorStats.objects.filter(author=self.author).update(posts_count=42)
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': self.author})
+        )
+        self.assertEqual(response.context['posts_count'], 42)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        self.assertEqual(response.context['posts_count'], 42)
+
+    def test_reconcile_stats_fixes_drift(self):
+        """Команда reconcile_stats исправляет расхождения счётчиков"""
+        AuthorStats.objects.filter(author=self.author).update(posts_count=42)
+        PostStats.objects.all().delete()
+        call_command('reconcile_stats', stdout=StringIO())
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).posts_count, 1
+        )
+        self.assertEqual(
+            PostStats.objects.get(post=self.post).comments_count, 0
+        )
+
+
+class QueryBudgetTests(TestCase):
+    """Число запросов страницы не зависит от числа постов на ней"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def add_posts(self, amount):
+        for number in range(amount):
+            author = User.objects.create_user(
+                username=f'author_{User.objects.count()}',
+                first_name='Имя',
+                last_name='Фамилия',
+            )
+            Follow.objects.create(user=self.reader, author=author)
+            Post.objects.create(
+                author=author, group=self.group, text=f'Пост {number}'
+            )
+
+    def check_budget(self, url, budget):
+        for amount in (1, POST_AMOUNT):
+            self.add_posts(amount)
+            cache.clear()
+            with self.subTest(url=url, posts=Post.objects.count()):
+                with self.assertNumQueries(budget):
+                    self.client.get(url)
+
+    def test_feeds_fit_query_budget(self):
+        """Ленты укладываются в фиксированное число запросов"""
+        urls = (
+            (reverse('posts:posts_index'), 4),
+            (reverse('posts:group_list', kwargs={'slug': 'test_slug'}), 5),
+            (reverse('posts:search') + '?q=Пост', 4),
+            (reverse('posts:follow_index'), 4),
+        )
+        for url, budget in urls:
+            Post.objects.all().delete()
+            self.check_budget(url, budget)
+
+    def test_profile_fits_query_budget(self):
+        """Профиль автора укладывается в фиксированное число запросов"""
+        author = User.objects.create_user(username='prolific')
+        url = reverse('posts:profile', kwargs={'username': 'prolific'})
+        for amount in (1, POST_AMOUNT):
+            Post.objects.bulk_create(
+                Post(author=author, group=self.group, text=f'Пост {number}')
+                for number in range(amount)
+            )
+            cache.clear()
+            with self.subTest(posts=amount):
+                with self.assertNumQueries(7):
+                    self.client.get(url)
+
+    def test_admin_changelist_fits_query_budget(self):
+        """Список постов в админке не делает запросов на каждую строку"""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        self.client.force_login(admin)
+        counts = []
+        for amount in (1, POST_AMOUNT):
+            self.add_posts(amount)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('admin:posts_post_changelist'))
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class CommentsPaginationTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с большим числом комментариев',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def add_comments(self, amount):
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=f'Комментарий {i}')
+            for i in range(amount)
+        )
+
+    def test_comments_are_loaded_by_pages(self):
+        """Комментарии выводятся страницами, следующие - фрагментом"""
+        self.add_comments(COMMENT_AMOUNT * 2 + 5)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENT_AMOUNT)
+        self.assertTrue(comments.has_next())
+        seen = [comment.pk for comment in comments]
+        url = reverse('posts:comments', kwargs={'post_id': self.post.id})
+        while comments.has_next():
+            response = self.client.get(url, {'cursor': comments.next_cursor})
+            comments = response.context['comments']
+            seen.extend(comment.pk for comment in comments)
+        self.assertEqual(len(comments), 5)
+        self.assertNotIn(b'<html', response.content)
+        self.assertEqual(
+            seen,
+            list(
+                Comment.objects.filter(post=self.post).order_by(
+                    '-created', '-pk'
+                ).values_list('pk', flat=True)
+            )
+        )
+
+    def test_post_detail_is_bounded(self):
+        """Страница поста делает одинаковое число запросов при любом
+        числе комментариев"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        counts = []
+        for amount in (1, COMMENT_AMOUNT * 5):
+            self.add_comments(amount)
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            counts.append(len(queries))
+            self.assertEqual(
+                len(response.context['comments']), min(amount, COMMENT_AMOUNT)
+            )
+        self.assertEqual(counts[0], counts[1])
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Кошки любят спать на солнце',
+        )
+        cls.another_post = Post.objects.create(
+            author=cls.user,
+            text='Собаки любят гулять, а кошки - нет. Кошки спят.',
+        )
+
+    def search(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_search_is_ranked(self):
+        """Поиск находит посты по словам и упорядочивает по релевантности"""
+        self.assertEqual(
+            self.search('КОШКИ'), [self.another_post.pk, self.post.pk]
+        )
+        self.assertEqual(self.search('собак'), [self.another_post.pk])
+        self.assertEqual(self.search('"OR*'), [])
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при изменении и удалении поста"""
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Попугаи любят петь по утрам'
+        post.save()
+        self.assertEqual(self.search('попугаи'), [self.post.pk])
+        self.assertEqual(self.search('солнце'), [])
+        Post.objects.filter(pk=self.another_post.pk).delete()
+        self.assertEqual(self.search('кошки'), [])
+
+    def test_rebuild_search_index_command(self):
+        """Команда rebuild_search_index восстанавливает индекс"""
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('солнце'), [self.post.pk])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт через полнотекстовый индекс"""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'солнце'}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['cl'].result_list],
+            [self.post.pk]
+        )
+
+
+    def test_admin_search_keeps_rank_order(self):
+        """Ранжирование поиска в админке не заменяется сортировкой по дате"""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'любят'}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['cl'].result_list],
+            [self.post.pk, self.another_post.pk]
+        )
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x01\x00'
+            b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+            b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+            b'\x00\x00\x01\x00\x01\x00\x00\x02'
+            b'\x02\x4c\x01\x00\x3b'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Post with an image to test thumbnails',
+            image=SimpleUploadedFile(
+                name='thumb.gif',
+                content=small_gif,
+                content_type='image/gif'
+            )
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def thumbnail_files(self):
+        return sorted(
+            path.join(directory, name)
+            for directory, _, names in walk(TEMP_MEDIA_ROOT)
+            for name in names
+        )
+
+    def get_images(self):
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        return re.findall(r'<img class="card-img my-2" [^>]+>',
+                          response.content.decode())
+
+    def test_original_image_until_thumbnails_are_ready(self):
+        """Пока миниатюр нет, выводится исходная картинка,
+        после warm_thumbnails - миниатюры всех размеров в srcset"""
+        self.assertIsNone(get_ready_srcset(self.post.image))
+        self.assertEqual(
+            self.get_images(),
+            [f'<img class="card-img my-2" src="{self.post.image.url}">']
+        )
+        with mock.patch.object(
+            default.engine, 'get_image', wraps=default.engine.get_image
+        ) as decode:
+            call_command('warm_thumbnails', workers=0, stdout=StringIO())
+        self.assertEqual(
+            [call.args[0].name for call in decode.call_args_list].count(
+                self.post.image.name
+            ),
+            1
+        )
+        srcset = get_ready_srcset(self.post.image)
+        self.assertEqual(
+            [width for url, width in srcset], [320, 640, 960]
+        )
+        self.assertEqual(self.get_images(), [
+            f'<img class="card-img my-2" src="{srcset[-1][0]}" '
+            f'srcset="{srcset[0][0]} 320w, {srcset[1][0]} 640w, '
+            f'{srcset[2][0]} 960w" '
+            f'sizes="{settings.POSTS_THUMBNAIL_SIZES}">'
+        ])
+
+    @override_settings(POSTS_THUMBNAIL_WIDTHS=[480, 960])
+    def test_new_widths_need_new_thumbnails(self):
+        """После смены набора ширин старый srcset не используется"""
+        call_command('warm_thumbnails', workers=0, stdout=StringIO())
+        with override_settings(POSTS_THUMBNAIL_WIDTHS=[320, 960]):
+            self.assertIsNone(get_ready_srcset(self.post.image))
+        self.assertEqual(
+            [width for url, width in get_ready_srcset(self.post.image)],
+            [480, 960]
+        )
+
+    def test_render_does_one_store_lookup_per_image(self):
+        """При рендере набор миниатюр читается одной записью"""
+        call_command('warm_thumbnails', workers=0, stdout=StringIO())
+        with mock.patch.object(
+            default.kvstore, '_get', wraps=default.kvstore._get
+        ) as lookup:
+            self.get_images()
+        self.assertEqual(lookup.call_count, 1)
+
+    def test_existing_thumbnails_are_not_written_again(self):
+        """Повторная генерация не создаёт копий файлов миниатюр,
+        а набор srcset переживает очистку кэша"""
+        generate_thumbnail(self.post.image.name)
+        files = self.thumbnail_files()
+        srcset = get_ready_srcset(self.post.image)
+        cache.clear()
+        self.assertEqual(get_ready_srcset(self.post.image), srcset)
+        with mock.patch.object(
+            default.engine, 'get_image', wraps=default.engine.get_image
+        ) as decode:
+            generate_thumbnail(self.post.image.name)
+        self.assertEqual(decode.call_count, 0)
+        self.assertEqual(self.thumbnail_files(), files)
+        self.assertEqual(get_ready_srcset(self.post.image), srcset)
+        for url, width in srcset:
+            self.assertTrue(path.exists(
+                path.join(TEMP_MEDIA_ROOT, url[len(settings.MEDIA_URL):])
+            ))
+
+    def test_warm_thumbnails_once_per_image(self):
+        """warm_thumbnails обрабатывает картинку один раз, даже если
+        она у нескольких постов, и пропускает готовые"""
+        Post.objects.create(
+            author=self.user, text='Same image', image=self.post.image.name
+        )
+        for created in (1, 0):
+            output = StringIO()
+            call_command('warm_thumbnails', workers=0, stdout=output)
+            self.assertIn(f'Создано миниатюр: {created},', output.getvalue())
+
+    def test_worker_pool_starts(self):
+        """Воркеры пула импортируют модуль миниатюр до django.setup()"""
+        with create_executor(1) as executor:
+            geometries = executor.submit(thumbnail_geometries).result()
+        self.assertEqual(geometries, thumbnail_geometries())
+
+    def test_srcset_is_deleted_with_thumbnails(self):
+        """sorl.thumbnail.delete удаляет и набор миниатюр для srcset"""
+        call_command('warm_thumbnails', workers=0, stdout=StringIO())
+        delete(self.post.image.name, delete_file=False)
+        self.assertIsNone(get_ready_srcset(self.post.image))
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='test_group',
+            slug='test-group',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Post to test conditional requests',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = (
+            reverse('posts:posts_index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        )
+
+    def test_not_modified_without_rendering(self):
+        """Повторный запрос с валидаторами получает 304 без рендера"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertFalse(response.has_header('Last-Modified'))
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+    def test_validators_change_after_write(self):
+        """После комментария ETag страницы поста меняется"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(
+            author=self.user, post=self.post, text='New comment'
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_validators_change_after_login(self):
+        """После повторного входа страница с формой не отдаётся по 304:
+        в ней новый CSRF-токен"""
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        client.get(url)
+        etag = client.get(url)['ETag']
+        # login() выдаёт новый токен (rotate_token)
+        client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_validators_change_after_delete(self):
+        """Удаление комментария не даёт 304 на изменённую страницу"""
+        comment = Comment.objects.create(
+            author=self.user, post=self.post, text='Comment to delete'
+        )
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        response = self.client.get(url)
+        comment.delete()
+        response = self.client.get(
+            url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=http_date(),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Comment to delete')
+
+
+class ObjectCacheTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='test_group',
+            slug='test-group',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Post to test the object cache',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lookups_are_read_through(self):
+        """Повторное чтение объекта и его отсутствия не идёт в базу"""
+        lookups = (
+            (Post, {'pk': self.post.pk}, self.post),
+            (Group, {'slug': 'test-group'}, self.group),
+            (Group, {'slug': 'missing'}, None),
+            (User, {'username': 'test_user'}, self.user),
+            (User, {'username': 'missing'}, None),
+        )
+        for model, lookup, expected in lookups:
+            with self.subTest(model=model, lookup=lookup):
+                with self.assertNumQueries(1):
+                    self.assertEqual(
+                        get_cached_object(model, **lookup), expected
+                    )
+                with self.assertNumQueries(0):
+                    self.assertEqual(
+                        get_cached_object(model, **lookup), expected
+                    )
+
+    def test_user_secrets_are_not_cached(self):
+        """В кэш попадают только выводимые поля пользователя"""
+        get_cached_object(User, username='test_user')
+        cached = cache.get(object_key(User, 'username', 'test_user'))
+        self.assertLessEqual(
+            {'password', 'email', 'is_staff', 'last_login'},
+            cached.get_deferred_fields()
+        )
+        self.assertNotIn(self.user.password, str(cached.__dict__))
+
+    def test_post_detail_reads_objects_from_cache(self):
+        """Страница поста не читает пост, автора и группу повторно"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.client.get(url)
+        bump_generation()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.context['post'], self.post)
+        self.assertEqual(response.context['post'].author, self.user)
+        self.assertFalse(any(
+            query['sql'].startswith(
+                ('SELECT "posts_post"', 'SELECT "auth_user"',
+                 'SELECT "posts_group"')
+            )
+            for query in queries
+        ))
+
+    def test_writes_invalidate_cached_objects(self):
+        """Изменение и удаление объектов сбрасывают кэш"""
+        get_cached_object(Group, slug='test-group')
+        get_cached_object(Group, slug='renamed')
+        get_cached_object(Post, pk=self.post.pk)
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.assertIsNone(get_cached_object(Group, slug='test-group'))
+        self.assertEqual(get_cached_object(Group, slug='renamed'), self.group)
+        Post.objects.filter(pk=self.post.pk).get().delete()
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class PostCardTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='test_user', first_name='Имя', last_name='Фамилия'
+        )
+        cls.group = Group.objects.create(
+            title='test_group',
+            slug='test-group',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Post to test card fragments',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.url = reverse('posts:posts_index')
+
+    def card_templates(self, response):
+        return [
+            template.name for template in response.templates
+            if template.name == 'posts/includes/post_card.html'
+        ]
+
+    def test_card_is_rendered_once_per_version(self):
+        """Карточка берётся из кэша, когда страница ленты устарела"""
+        response = self.client.get(self.url)
+        self.assertEqual(len(self.card_templates(response)), 1)
+        bump_generation()
+        response = self.client.get(self.url)
+        self.assertEqual(self.card_templates(response), [])
+        self.assertContains(response, self.post.text)
+
+    def test_card_changes_after_edits(self):
+        """Правка поста, группы и имени автора обновляют карточку"""
+        self.client.get(self.url)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            data={'text': 'Edited text of the card', 'group': self.group.pk},
+        )
+        self.assertContains(
+            self.client.get(self.url), 'Edited text of the card'
+        )
+        self.group.slug = 'renamed-group'
+        self.group.save()
+        self.assertContains(
+            self.client.get(self.url),
+            reverse('posts:group_list', kwargs={'slug': 'renamed-group'})
+        )
+        self.user.first_name = 'Новое'
+        self.user.save()
+        self.assertContains(self.client.get(self.url), 'Новое Фамилия')
+
+    def test_rename_of_author_without_posts_updates_pages(self):
+        """Переименование автора без постов обновляет его комментарии"""
+        commenter = User.objects.create_user(username='commenter')
+        Comment.objects.create(
+            post=self.post, author=commenter, text='Комментарий'
+        )
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.assertContains(self.client.get(url), 'commenter')
+        commenter.username = 'renamed_commenter'
+        commenter.save()
+        self.assertContains(self.client.get(url), 'renamed_commenter')
+
+    def test_card_changes_after_group_delete(self):
+        """После удаления группы карточка не ссылается на неё"""
+        group = Group.objects.get(pk=self.group.pk)
+        group_url = reverse('posts:group_list', kwargs={'slug': group.slug})
+        self.assertContains(self.client.get(self.url), group_url)
+        group.delete()
+        self.assertNotContains(self.client.get(self.url), group_url)
@@ -0,0 +1,211 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from threading import Lock
+
+from django.conf import settings
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.parsers import parse_geometry
+
+from .caching import bump_generation
+
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_lock = Lock()
+
+
+def thumbnail_geometries():
+    """Геометрии миниатюр для POSTS_THUMBNAIL_WIDTHS.
+
+    Пропорции берутся от THUMBNAIL_GEOMETRY.
+    """
+
+    width, height = map(int, THUMBNAIL_GEOMETRY.split('x'))
+    return [
+        f'{size}x{round(size * height / width)}'
+        for size in sorted(settings.POSTS_THUMBNAIL_WIDTHS)
+    ]
+
+
+class ResponsiveThumbnailBackend(ThumbnailBackend):
+    """Backend sorl, создающий все размеры миниатюр за одно декодирование.
+
+    Миниатюры регистрируются в key-value store sorl под своими
+    обычными именами, а набор размеров для srcset хранится там же
+    одной записью (posts.kvstore), чтобы при рендере был один поиск
+    на картинку.
+    """
+
+    def get_options(self, source, **options):
+        """Параметры, дополненные так же, как в get_thumbnail, поэтому
+        имена миниатюр совпадают с теми, что создаст sorl."""
+
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def get_srcset(self, file_):
+        """Готовые миниатюры [(имя, ширина), ...] или None.
+
+        Запись, созданная для другого набора размеров, не подходит.
+        """
+
+        entry = default.kvstore.get_srcset(ImageFile(file_))
+        if not entry or entry['geometries'] != thumbnail_geometries():
+            return None
+        return [tuple(item) for item in entry['thumbnails']]
+
+    def decode(self, source):
+        source_image = default.engine.get_image(source)
+        source.set_size(default.engine.get_image_size(source_image))
+        return source_image
+
+    def create_srcset(self, file_):
+        """Создание недостающих миниатюр и записи набора для srcset.
+
+        Уже созданные размеры не пересоздаются, а исходная картинка
+        декодируется, только если чего-то не хватает.
+        """
+
+        source = ImageFile(file_, default.storage)
+        options = self.get_options(source, **THUMBNAIL_OPTIONS)
+        source_image = None
+        if default.kvstore.get(source) is None:
+            source_image = self.decode(source)
+            default.kvstore.set(source)
+        thumbnails = []
+        for geometry_string in thumbnail_geometries():
+            thumbnail = ImageFile(
+                self._get_thumbnail_filename(
+                    source, geometry_string, options
+                ),
+                default.storage
+            )
+            stored = default.kvstore.get(thumbnail)
+            if stored is not None:
+                thumbnail = stored
+            elif thumbnail.exists():
+                default.kvstore.set(thumbnail, source)
+            else:
+                if source_image is None:
+                    source_image = self.decode(source)
+                ratio = default.engine.get_image_ratio(source_image, options)
+                image = default.engine.create(
+                    source_image,
+                    parse_geometry(geometry_string, ratio),
+                    options
+                )
+                # write() сохраняет имя, под которым файл записан
+                default.engine.write(image, options, thumbnail)
+                thumbnail.set_size(default.engine.get_image_size(image))
+                default.kvstore.set(thumbnail, source)
+            thumbnails.append((thumbnail.name, thumbnail.width))
+        default.kvstore.set_srcset(
+            source,
+            {'geometries': thumbnail_geometries(), 'thumbnails': thumbnails}
+        )
+        return thumbnails
+
+
+backend = ResponsiveThumbnailBackend()
+
+
+def get_ready_srcset(image):
+    """Готовые миниатюры картинки поста [(url, ширина), ...] или None."""
+
+    srcset = backend.get_srcset(image)
+    if srcset is None:
+        return None
+    return [(default.storage.url(name), width) for name, width in srcset]
+
+
+def generate_thumbnail(name):
+    """Создание всех размеров миниатюры картинки name
+    (выполняется в воркере).
+
+    Страницы, закэшированные с исходной картинкой, устаревают:
+    начинается новое поколение контента.
+    """
+
+    backend.create_srcset(name)
+    bump_generation()
+    return name
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def create_executor(workers):
+    """Пул процессов для генерации миниатюр.
+
+    Используется spawn: воркеры не наследуют соединения с БД
+    и состояние родительского процесса.
+    """
+
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_worker,
+    )
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = create_executor(settings.POSTS_THUMBNAIL_WORKERS)
+        return _executor
+
+
+def _finished(name, future):
+    with _lock:
+        _pending.discard(name)
+    if future.exception() is not None:
+        logger.error(
+            'Не удалось создать миниатюру %s', name,
+            exc_info=future.exception()
+        )
+
+
+def schedule_thumbnail(name):
+    """Постановка генерации миниатюры в очередь фонового пула.
+
+    При POSTS_THUMBNAIL_WORKERS == 0 миниатюра создаётся сразу.
+    """
+
+    global _executor
+    if not name:
+        return
+    if not settings.POSTS_THUMBNAIL_WORKERS:
+        generate_thumbnail(name)
+        return
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    try:
+        future = get_executor().submit(generate_thumbnail, name)
+    except BrokenProcessPool:
+        with _lock:
+            _executor = None
+        future = get_executor().submit(generate_thumbnail, name)
+    future.add_done_callback(partial(_finished, name))
@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.db import connection
+
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 500
+
+ENTRY_TABLE = TimelineEntry._meta.db_table
+FOLLOW_TABLE = Follow._meta.db_table
+
+# Обрезка лент всех подписчиков автора одним запросом. Для каждого
+# подписчика по индексу (user, -pub_date) находится дата последней
+# записи, попадающей в ленту, и удаляются только записи старше неё;
+# записи с той же датой остаются, поэтому при совпадении дат лента
+# может ненадолго оказаться чуть длиннее.
+TRIM_FOLLOWERS_SQL = (
+    f"DELETE FROM {ENTRY_TABLE} WHERE id IN ("
+    f"SELECT entry.id FROM ("
+    f"SELECT follow.user_id AS user_id, ("
+    f"SELECT last.pub_date FROM {ENTRY_TABLE} AS last "
+    f"WHERE last.user_id = follow.user_id "
+    f"ORDER BY last.pub_date DESC LIMIT 1 OFFSET %s"
+    f") AS pub_date "
+    f"FROM {FOLLOW_TABLE} AS follow WHERE follow.author_id = %s"
+    f") AS cutoff "
+    f"JOIN {ENTRY_TABLE} AS entry ON entry.user_id = cutoff.user_id "
+    f"AND entry.pub_date < cutoff.pub_date)"
+)
+
+
+def get_timeline_length():
+    return settings.POSTS_TIMELINE_LENGTH
+
+
+def timeline_posts(user):
+    """Посты из материализованной ленты подписок пользователя."""
+
+    return Post.objects.feed().filter(
+        timeline_entries__user=user
+    ).order_by('-timeline_entries__pub_date', '-timeline_entries__post__id')
+
+
+def trim_timeline(user_id):
+    """Удаление из ленты записей сверх POSTS_TIMELINE_LENGTH."""
+
+    stale = TimelineEntry.objects.filter(
+        user_id=user_id
+    ).order_by('-pub_date', '-pk').values('pk')[get_timeline_length():]
+    TimelineEntry.objects.filter(pk__in=stale).delete()
+
+
+def trim_followers(author_id):
+    """Удаление записей сверх POSTS_TIMELINE_LENGTH из лент всех
+    подписчиков автора."""
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            TRIM_FOLLOWERS_SQL, [get_timeline_length() - 1, author_id]
+        )
+
+
+def fan_out_post(post):
+    """Раскладка нового поста по лентам подписчиков автора."""
+
+    followers = list(
+        Follow.objects.filter(
+            author_id=post.author_id
+        ).values_list('user_id', flat=True)
+    )
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date
+            ) for user_id in followers
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    if followers:
+        trim_followers(post.author_id)
+
+
+def backfill_timeline(user_id, author_id):
+    """Добавление в ленту последних постов автора после подписки."""
+
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date')[:get_timeline_length()]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date
+            ) for post_id, pub_date in posts
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    trim_timeline(user_id)
+
+
+def remove_from_timeline(user_id, author_id):
+    """Удаление постов автора из ленты после отписки."""
+
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        author_id=author_id
+    ).delete()
+
+
+def rebuild_timeline(user_id):
+    """Полная пересборка ленты пользователя по его подпискам."""
+
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    authors = Follow.objects.filter(
+        user_id=user_id
+    ).values_list('author_id', flat=True)
+    for author_id in authors:
+        backfill_timeline(user_id, author_id)
@@ -1,38 +1,78 @@
+from hashlib import md5
 from os import path
+from urllib.parse import urlencode
 
-from django.core.paginator import Paginator
-from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
-from .models import Post, Group, Follow, User
+from django.db import transaction
+from .models import Post, Group, User, Comment
+from .caching import cache_feed_page, conditional_page
+from .follows import follow, is_following, unfollow
 from .forms import PostForm, CommentForm
+from .objects import get_cached_object, get_cached_object_or_404
+from .paginators import CachedCountPaginator, CursorPaginator
+from .search import search_posts
+from .stats import author_stats, post_stats
+from .timeline import timeline_posts
 
 POST_AMOUNT = 10
+COMMENT_AMOUNT = 20
 
 
-def get_page_obj(request, posts_list, posts_amount=POST_AMOUNT):
-    """Получение страницы с постами от паджинатора."""
+def get_page_obj(request, posts_list, posts_amount=POST_AMOUNT,
+                 count_key=None):
+    """Получение страницы с постами от паджинатора.
 
-    paginator = Paginator(posts_list, posts_amount)
+    В режиме settings.POSTS_PAGINATION == 'cursor' страница
+    выбирается по курсору (?cursor=...), иначе - по номеру (?page=N).
+    count_key - имя ленты, под которым кэшируется число постов.
+    """
+
+    if settings.POSTS_PAGINATION == 'cursor':
+        paginator = CursorPaginator(posts_list, posts_amount)
+        return paginator.get_page(request.GET.get('cursor'))
+    paginator = CachedCountPaginator(
+        posts_list, posts_amount, count_key=count_key
+    )
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
-@cache_page(20, key_prefix='index_page')
+def get_comments_page(request, post_id):
+    """Страница комментариев к посту, новые первыми.
+
+    Комментарии выбираются по курсору на created (?cursor=...),
+    поэтому страница поста не зависит от их общего числа.
+    """
+
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only('post_id', 'text', 'created', 'author__username')
+    paginator = CursorPaginator(comments, COMMENT_AMOUNT, field='created')
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@conditional_page
+@cache_feed_page('index_page')
 def index(request):
     """Главная страница проекта yatube."""
 
     template = path.join('posts', 'index.html')
-    page_obj = get_page_obj(request, Post.objects.all())
+    page_obj = get_page_obj(request, Post.objects.feed(), count_key='index')
     return render(request, template, {'page_obj': page_obj})
 
 
+@conditional_page
+@cache_feed_page('group_page')
 def group_posts(request, slug):
     """Страница с группами проекта Yatube."""
 
     template = path.join('posts', 'group_list.html')
-    group = get_object_or_404(Group, slug=slug)
-    page_obj = get_page_obj(request, group.posts.all())
+    group = get_cached_object_or_404(Group, slug=slug)
+    page_obj = get_page_obj(
+        request, group.posts.feed(), count_key=f'group:{group.pk}'
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -40,7 +80,27 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+def search(request):
+    """Полнотекстовый поиск по постам."""
+
+    template = path.join('posts', 'search.html')
+    query = request.GET.get('q', '').strip()
+    paginator = CachedCountPaginator(
+        search_posts(query, Post.objects.feed()),
+        POST_AMOUNT,
+        count_key='search:' + md5(query.encode()).hexdigest()
+    )
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'pagination_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, template, context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     """Создание записи."""
 
@@ -62,13 +122,14 @@ def post_create(request):
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     """Редактирование поста."""
 
     template = path.join('posts', 'create_post.html')
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_cached_object_or_404(Post, pk=post_id)
     is_edit = 1
-    if request.user == post.author:
+    if request.user.pk == post.author_id:
         form = PostForm(
             request.POST or None,
             files=request.FILES or None,
@@ -85,54 +146,70 @@ def post_edit(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@conditional_page
 def post_detail(request, post_id):
     """Детали поста."""
 
     length_title = 30
     template = path.join('posts', 'post_detail.html')
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_cached_object_or_404(Post, pk=post_id)
+    post.author = get_cached_object(User, pk=post.author_id)
+    if post.group_id:
+        post.group = get_cached_object(Group, pk=post.group_id)
     title = f'Пост {post.text[:length_title]}'
-    author = get_object_or_404(User, username=post.author.username)
-    posts_list = Post.objects.filter(author__exact=author).all()
     context = {
         'title': title,
         'post': post,
-        'posts_count': posts_list.count(),
+        'posts_count': author_stats(post.author).posts_count,
+        'comments_count': post_stats(post).comments_count,
         'form': CommentForm(),
-        'comments': post.comments.all(),
+        'comments': get_comments_page(request, post_id),
+    }
+    return render(request, template, context)
+
+
+@conditional_page
+def comments(request, post_id):
+    """Следующая страница комментариев для кнопки «Показать ещё»."""
+
+    template = path.join('posts', 'includes', 'comment_list.html')
+    post = get_cached_object_or_404(Post, pk=post_id)
+    context = {
+        'post': post,
+        'comments': get_comments_page(request, post_id),
     }
     return render(request, template, context)
 
 
+@conditional_page
+@cache_feed_page('profile_page')
 def profile(request, username):
     """Профайл пользователя."""
 
     template = path.join('posts', 'profile.html')
-    author = get_object_or_404(User, username=username)
-    posts_list = Post.objects.filter(author__exact=author).all()
-    posts_count = posts_list.count()
-    page_obj = get_page_obj(request, posts_list)
-    following = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).exists()
+    author = get_cached_object_or_404(User, username=username)
+    stats = author_stats(author)
+    page_obj = get_page_obj(
+        request, author.posts.feed(), count_key=f'profile:{author.pk}'
+    )
     context = {
         'author': author,
         'page_obj': page_obj,
-        'posts_count': posts_count,
-        'following': following
+        'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+        'following': is_following(request.user, author)
     }
     return render(request, template, context)
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     """Добавление комментария."""
 
     template = path.join('posts', 'post_detail.html')
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_cached_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -143,7 +220,7 @@ def add_comment(request, post_id):
     context = {
         'form': form,
         'post': post,
-        'comments': post.comments.all(),
+        'comments': get_comments_page(request, post_id),
     }
     return render(request, template, context)
 
@@ -153,37 +230,30 @@ def follow_index(request):
     """Страница с подписками на авторов."""
 
     template = path.join('posts', 'follow.html')
-    posts_list = Post.objects.filter(
-        author__following__user=request.user
-    ).all()
-    page_obj = get_page_obj(request, posts_list)
+    posts_list = timeline_posts(request.user)
+    page_obj = get_page_obj(
+        request, posts_list, count_key=f'follow:{request.user.pk}'
+    )
     context = {'page_obj': page_obj}
     return render(request, template, context)
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     """Подписка на автора username."""
 
-    author = get_object_or_404(User, username=username)
-    user_is_follower = Follow.objects.filter(
-        user=request.user,
-        author=author
-    ).exists()
-    if request.user != author and not user_is_follower:
-        Follow.objects.create(user=request.user, author=author)
+    author = get_cached_object_or_404(User, username=username)
+    if request.user != author:
+        follow(request.user, author)
     return redirect('posts:profile', username=username)
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     """Отписка от автора username."""
 
-    author = get_object_or_404(User, username=username)
-    follower_record = Follow.objects.filter(
-        user=request.user,
-        author=author
-    )
-    if follower_record.exists():
-        follower_record.delete()
+    author = get_cached_object_or_404(User, username=username)
+    unfollow(request.user, author)
     return redirect('posts:profile', username=username)
@@ -0,0 +1,16 @@
+// Подгрузка следующей страницы комментариев вместо перехода по ссылке.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('.js-load-comments');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  fetch(link.dataset.url, {credentials: 'same-origin'})
+    .then(function (response) {
+      return response.text();
+    })
+    .then(function (html) {
+      link.insertAdjacentHTML('afterend', html);
+      link.remove();
+    });
+});
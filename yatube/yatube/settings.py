@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -53,25 +54,30 @@ INSTALLED_APPS = [
     'about.apps.AboutConfig',
     'core.apps.CoreConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'users.apps.UsersConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.PerformanceMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.AnonymousPageCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -92,13 +98,52 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# core.db.sqlite3: PRAGMA при открытии соединения и BEGIN IMMEDIATE
+# в transaction.atomic; CONN_MAX_AGE сохраняет соединение между запросами.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'OPTIONS': {
+            'pragmas': {
+                'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'wal'),
+                'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'normal'),
+                'mmap_size': int(
+                    os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+                ),
+                'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64000)),
+                'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+            },
+            'transaction_mode': os.getenv(
+                'SQLITE_TRANSACTION_MODE', 'IMMEDIATE'
+            ),
+        },
     }
 }
 
+# Соединение для чтений (core.db.routers): второе соединение к тому же
+# файлу только для чтения, которое в режиме WAL не ждёт писателей.
+# Отстающая копия базы не поддерживается: прочитанные из неё данные
+# попадали бы в кэши страниц и объектов под текущим поколением
+# и оставались бы там после того, как копия догонит основную базу.
+if os.getenv('DB_READ_CONNECTION', '0') == '1':
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'OPTIONS': {
+            'pragmas': {
+                **DATABASES['default']['OPTIONS']['pragmas'],
+                'query_only': 1,
+            },
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db.routers.PrimaryReplicaRouter']
+
+# Сколько секунд после записи чтения сессии идут в основную базу
+DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 15))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -137,6 +182,15 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.getenv(
+    'STATIC_ROOT', os.path.join(BASE_DIR, 'collected_static')
+)
+
+# Хеш в именах файлов и сжатые копии (.gz, .br) создаются в collectstatic
+STATICFILES_STORAGE = os.getenv(
+    'STATICFILES_STORAGE',
+    'core.staticfiles.CompressedManifestStaticFilesStorage'
+)
 
 # A directory for storing media files
 MEDIA_URL = '/media/'
@@ -151,9 +205,79 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # Set the path in which email files will be stored
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
-# Caching backend
+# Posts feed pagination: 'numbered' (?page=N) or 'cursor' (?cursor=...)
+POSTS_PAGINATION = os.getenv('POSTS_PAGINATION', 'numbered')
+
+# Maximum number of posts kept in a materialized follow timeline
+POSTS_TIMELINE_LENGTH = int(os.getenv('POSTS_TIMELINE_LENGTH', 1000))
+
+# Background thumbnail workers (0 - generate thumbnails in the request)
+POSTS_THUMBNAIL_WORKERS = int(os.getenv('POSTS_THUMBNAIL_WORKERS', 2))
+
+# Ширины миниатюр для srcset и атрибут sizes (posts.thumbnails)
+POSTS_THUMBNAIL_WIDTHS = [
+    int(width) for width in
+    os.getenv('POSTS_THUMBNAIL_WIDTHS', '320,640,960').split(',')
+]
+POSTS_THUMBNAIL_SIZES = os.getenv(
+    'POSTS_THUMBNAIL_SIZES', '(max-width: 960px) 100vw, 960px'
+)
+
+# sorl.thumbnail.delete() удаляет и набор миниатюр для srcset
+THUMBNAIL_KVSTORE = 'posts.kvstore.SrcsetKVStore'
+
+# Обработка картинок постов при загрузке (posts.images)
+POSTS_IMAGE_MAX_SIZE = int(os.getenv('POSTS_IMAGE_MAX_SIZE', 2048))
+POSTS_IMAGE_FORMAT = os.getenv('POSTS_IMAGE_FORMAT', 'WEBP').upper()
+POSTS_IMAGE_QUALITY = int(os.getenv('POSTS_IMAGE_QUALITY', 80))
+
+# Lifetime of feed pages in the generation-versioned page cache, seconds
+POSTS_PAGE_CACHE_TIMEOUT = int(
+    os.getenv('POSTS_PAGE_CACHE_TIMEOUT', 6 * 60 * 60)
+)
+
+# Read-through object cache (posts.objects): found objects and misses
+POSTS_OBJECT_CACHE_TIMEOUT = int(
+    os.getenv('POSTS_OBJECT_CACHE_TIMEOUT', 6 * 60 * 60)
+)
+POSTS_MISSING_CACHE_TIMEOUT = int(os.getenv('POSTS_MISSING_CACHE_TIMEOUT', 60))
+
+# Cache stampede protection (core.cache.stampede): how long a lock is held,
+# how long to wait for another worker's result, how long stale entries are
+# kept to be served during recomputation, and how eagerly to refresh early
+CACHE_LOCK_TIMEOUT = int(os.getenv('CACHE_LOCK_TIMEOUT', 30))
+CACHE_LOCK_WAIT = float(os.getenv('CACHE_LOCK_WAIT', 2))
+CACHE_STALE_TIMEOUT = int(os.getenv('CACHE_STALE_TIMEOUT', 5 * 60))
+CACHE_EARLY_REFRESH_BETA = float(os.getenv('CACHE_EARLY_REFRESH_BETA', 1))
+
+# Full-page cache for anonymous visitors (core.middleware)
+ANONYMOUS_CACHE_NAMESPACES = ['posts', 'about']
+ANONYMOUS_CACHE_VERSION = 'posts.caching.get_generation'
+ANONYMOUS_CACHE_TIMEOUT = int(
+    os.getenv('ANONYMOUS_CACHE_TIMEOUT', POSTS_PAGE_CACHE_TIMEOUT)
+)
+
+# Caching backend: a SQLite file shared by all worker processes on the node
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': os.getenv('CACHE_BACKEND', 'core.cache.sqlite.SQLiteCache'),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {
+            'MAX_SIZE': int(os.getenv('CACHE_MAX_SIZE', 256 * 1024 * 1024)),
+        },
     }
 }
+
+# Tests clear the cache, so the runner moves it to a temporary file
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Per-view request metrics (core.metrics), collected by PerformanceMiddleware
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+METRICS_DIR = os.getenv(
+    'METRICS_DIR',
+    os.path.join(tempfile.gettempdir(), 'yatube-metrics')
+)
+METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', 10))